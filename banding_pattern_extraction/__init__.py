@@ -1,10 +1,57 @@
-""" Main interface """
-from .scripts.banding_pattern_extraction import get_banding_pattern, get_banding_pattern_multi_process
-from .scripts.banding_pattern_extraction_from_folder import folder_to_bp_csv as banding_pattern_extraction_from_folder_to_csv
-from .scripts.chromosome_segmentation import get_segmented_chromosome
-from .scripts.impose_random_banding_pattern import impose_random_bp
-
-""" Some utility functions """
-from .scripts.lib.visualisation_utils import binary_vector_to_bp_image, binary_vector_comparison_img
-from .scripts.lib.utils import generate_random_banding_patterns, one_hot_encode, pad_bp, clip_bp
-from .scripts.lib.banding_pattern_utils import resize_banding_pattern, cluster_1D
\ No newline at end of file
+import importlib
+
+# The public interface is imported lazily on first access, so importing the package is fast and the
+# extraction path never imports plotting or pattern generation modules it does not use.
+# Name: (module, attribute)
+_LAZY_ATTRIBUTES = {
+    # Main interface
+    'get_banding_pattern': ('.scripts.banding_pattern_extraction', 'get_banding_pattern'),
+    'get_banding_pattern_multi_process': ('.scripts.batch_extraction', 'get_banding_pattern_multi_process'),
+    'iter_banding_patterns': ('.scripts.batch_extraction', 'iter_banding_patterns'),
+    'AsyncExtractor': ('.scripts.async_extraction', 'AsyncExtractor'),
+    'extract_async': ('.scripts.async_extraction', 'extract_async'),
+    'iter_extract_async': ('.scripts.async_extraction', 'iter_extract_async'),
+    'ExtractionServer': ('.scripts.extraction_server', 'ExtractionServer'),
+    'extract_remote': ('.scripts.extraction_client', 'extract_remote'),
+    'extract_remote_bytes': ('.scripts.extraction_client', 'extract_remote_bytes'),
+    'BandingPatternPipeline': ('.scripts.pipeline', 'BandingPatternPipeline'),
+    'parameter_sweep': ('.scripts.parameter_sweep', 'parameter_sweep'),
+    'sweep_to_csv': ('.scripts.parameter_sweep', 'sweep_to_csv'),
+    'banding_pattern_extraction_from_folder_to_csv': ('.scripts.banding_pattern_extraction_from_folder', 'folder_to_bp_csv'),
+    'get_segmented_chromosome': ('.scripts.chromosome_segmentation', 'get_segmented_chromosome'),
+    'chromosome_segmentation_from_folder': ('.scripts.chromosome_segmentation_from_folder', 'folder_to_segmentations'),
+    'load_segmentation_stack': ('.scripts.chromosome_segmentation_from_folder', 'load_segmentation_stack'),
+    'impose_random_bp': ('.scripts.impose_random_banding_pattern', 'impose_random_bp'),
+    'ChromosomeGeometry': ('.scripts.chromosome_geometry', 'ChromosomeGeometry'),
+    'augment_chromosomes': ('.scripts.augmentation', 'augment_chromosomes'),
+    'ResultCache': ('.scripts.lib.result_cache', 'ResultCache'),
+    'PatternStore': ('.scripts.lib.pattern_store', 'PatternStore'),
+    'PatternStoreWriter': ('.scripts.lib.pattern_store', 'PatternStoreWriter'),
+    'write_pattern_store': ('.scripts.lib.pattern_store', 'write_pattern_store'),
+    'csv_to_pattern_store': ('.scripts.lib.pattern_store', 'csv_to_pattern_store'),
+
+    # Some utility functions
+    'binary_vector_to_bp_image': ('.scripts.lib.visualisation_utils', 'binary_vector_to_bp_image'),
+    'binary_vector_comparison_img': ('.scripts.lib.visualisation_utils', 'binary_vector_comparison_img'),
+    'generate_random_banding_patterns': ('.scripts.lib.utils', 'generate_random_banding_patterns'),
+    'one_hot_encode': ('.scripts.lib.utils', 'one_hot_encode'),
+    'pad_bp': ('.scripts.lib.utils', 'pad_bp'),
+    'clip_bp': ('.scripts.lib.utils', 'clip_bp'),
+    'resize_banding_pattern': ('.scripts.lib.banding_pattern_utils', 'resize_banding_pattern'),
+    'cluster_1D': ('.scripts.lib.banding_pattern_utils', 'cluster_1D'),
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value # cache, so __getattr__ is only called once per name
+
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,28 @@
+import argparse
+import os
+
+from scripts.augmentation import augment_chromosomes
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Imposes many random banding patterns onto each chromosome image of a folder.')
+    parser.add_argument('-s', '--source_path', help='source path', required=True)
+    parser.add_argument('-d', '--destination_path', help='destination path', required=True)
+    parser.add_argument('-n', '--count', help='number of random patterns per image', type=int, default=10)
+    parser.add_argument('-w', '--workers', help='number of processes', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', help='seed of the random patterns', type=int, default=0)
+    parser.add_argument('--extraction_size', help='size at which the chromosomes are extracted, e.g. 128', type=int, default=None)
+
+    args = parser.parse_args()
+
+    file_names = sorted(os.listdir(args.source_path))
+    imgs = {file_name: os.path.join(args.source_path, file_name) for file_name in file_names}
+
+    rows = augment_chromosomes(imgs, args.count, workers=args.workers, seed=args.seed,
+        extraction_size=args.extraction_size, destination_path=args.destination_path)
+
+    for row in rows:
+        if row['error']:
+            print("Augmentation of '{0}' failed, due to: {1}".format(row['image'], row['error_message']))
+
+    print("Wrote {0} images of {1} chromosomes.".format(sum(len(row['paths']) for row in rows if not row['error']), len(rows) - sum(row['error'] for row in rows)))
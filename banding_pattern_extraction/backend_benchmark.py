@@ -0,0 +1,34 @@
+import argparse
+import os
+import cv2 as cv
+
+from scripts.backend_benchmark import benchmark_backends, crossover_size
+
+if __name__ == "__main__":
+
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imgs', 'synthetic_chromosome.png')
+
+    parser = argparse.ArgumentParser(description='Finds the image size at which the process backend of the batch extraction beats the thread backend.')
+    parser.add_argument('-p', '--path', help='chromosome image that is resized to each size', default=default_path)
+    parser.add_argument('--sizes', help='square image sizes', type=int, nargs='+', default=[64, 128, 256, 512])
+    parser.add_argument('--batch_size', help='images per batch', type=int, default=64)
+    parser.add_argument('--workers', help='number of threads or processes', type=int, default=os.cpu_count())
+    parser.add_argument('--repeats', help='timed repetitions, the best one is reported', type=int, default=1)
+    parser.add_argument('--threshold', help='Segmentation threshold', type=int, nargs='?', default=254)
+
+    args = parser.parse_args()
+
+    img = cv.imread(args.path, 0)
+    rows = benchmark_backends(img, args.sizes, args.batch_size, args.workers, args.repeats, chromsome_threshold=args.threshold)
+
+    print("{0:>8} {1:>14} {2:>15} {3:>8}".format('size', 'thread [img/s]', 'process [img/s]', 'faster'))
+    for row in rows:
+        print("{0:>8} {1:>14.1f} {2:>15.1f} {3:>8}".format(row['size'], row['thread'], row['process'], row['faster']))
+
+    crossover = crossover_size(rows)
+    if crossover is not None:
+        print("Processes are faster from size", crossover, "on")
+    elif all(row['faster'] == 'thread' for row in rows):
+        print("Threads are faster for all benchmarked sizes")
+    else:
+        print("No crossover, threads are faster at the largest size, but processes won at some smaller sizes")
@@ -18,6 +18,8 @@ if __name__ == "__main__":
     parser.add_argument('--density_sigma', help='Sigma for Gaussian filter of the density profiles', type=int, nargs='?', default=2)
     parser.add_argument('--threshold', help='Segmentation threshold', type=int, nargs='?', default=254)
     parser.add_argument('--size', help='Size of the  banding pattern, extraction will be resized accordingly', type=int, nargs='?', default=None)
+    parser.add_argument('--roi_margin', help='Only process the bounding box of the chromosome, extended by this margin', type=int, nargs='?', default=None)
+    parser.add_argument('--downsample_factor', help='Search the medial axis on a segmentation downsampled by this factor', type=int, nargs='?', default=1)
 
     args = parser.parse_args()
     img_path = args.path
@@ -26,6 +28,8 @@ if __name__ == "__main__":
     density_sigma = args.density_sigma
     chromsome_threshold = args.threshold
     size = args.size
+    roi_margin = args.roi_margin
+    downsample_factor = args.downsample_factor
     step_vector = 1
 
     t1 = time()
@@ -36,7 +40,7 @@ if __name__ == "__main__":
     # A lot of results for visualisation purposes
     try:
         t1 = time()
-        results = get_banding_pattern(img, pixel_sampling, pixel_sigma, density_sigma, step_vector, chromsome_threshold=254, size=size)
+        results = get_banding_pattern(img, pixel_sampling, pixel_sigma, density_sigma, step_vector, chromsome_threshold=254, size=size, roi_margin=roi_margin, downsample_factor=downsample_factor)
         print("Time: ", time() - t1)
         
         if results["error"]:
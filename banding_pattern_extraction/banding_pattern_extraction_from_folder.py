@@ -1,9 +1,8 @@
 import argparse
 import os
-import csv
-import traceback 
 
-from scripts.banding_pattern_extraction import get_banding_pattern
+from scripts.banding_pattern_extraction_from_folder import folder_to_bp_csv
+from scripts.lib.sharding import parse_shard
 
 if __name__ == "__main__":
 
@@ -14,47 +13,27 @@ if __name__ == "__main__":
     parser.add_argument('--pixel_sigma', help='Sigma for Gaussian filter that is applied on the skeleton pixels pixel prior sub sampling', type=int, nargs='?', default=2)
     parser.add_argument('--density_sigma', help='Sigma for Gaussian filter of the density profiles', type=int, nargs='?', default=2)
     parser.add_argument('--threshold', help='Segmentation threshold', type=int, nargs='?', default=254)
+    parser.add_argument('--workers', help='Number of extraction processes', type=int, nargs='?', default=os.cpu_count())
+    parser.add_argument('--prefetch', help='Number of images that are decoded ahead of the extraction', type=int, nargs='?', default=16)
+    parser.add_argument('--resume', help='Skip files that are already in the csv and append the new rows', action='store_true')
+    parser.add_argument('--timeout', help='Time budget per image in seconds', type=float, nargs='?', default=None)
+    parser.add_argument('--shard', help='Only extract shard i of N (zero based), given as i/N, see merge_shards.py', type=parse_shard, default=None)
+    parser.add_argument('--store_name', help='Also write the patterns into a binary store of this name', default=None)
 
     args = parser.parse_args()
-    source_path = args.source_path
-    destination_path = args.destination_path
-    pixel_sampling = args.pixel_sampling
-    pixel_sigma = args.pixel_sigma
-    density_sigma = args.density_sigma
-    chromsome_threshold = args.threshold
-    step_vector = 1
 
-    file_list = os.listdir(source_path)
-    banding_patterns = {}
-
-    amount = len(file_list)
-
-    # Extract all patterns, if possible, and save into dict
-    for i in range(amount):
-        file_name = file_list[i]
-        if (i+1) % 100 == 0:
-            print("Finished:", i / amount)
-        file_path = os.path.join(source_path, file_name)
-        img = cv.imread(file_path, 0)
-
-        try:
-            bp = get_banding_pattern(img, pixel_sampling, pixel_sigma, density_sigma, step_vector, chromsome_threshold=chromsome_threshold, reject_multiple_blobs=False)
-            if not bp['error']:
-                banding_patterns[file_name] = bp['binarized_banding_pattern']
-            else:
-                raise bp["error_message"]
-        except Exception as e:
-            print("Extraction of '{0}' failed, due to: {1}".format(file_name, e))
-            traceback.print_exc()
-
-    # Save dict with banding patterns
-    source_file = os.path.join(destination_path, 'banding_patterns.csv')
-    with open(source_file, 'w') as f:
-        writer = csv.writer(f)
-
-        # header
-        writer.writerow(["file_name", "banding_pattern"])
-        for file_name, bp in banding_patterns.items():
-            bp_string = [str(x) for x in bp]
-            bp_string = " ".join(bp_string)
-            writer.writerow([file_name, bp_string])
\ No newline at end of file
+    folder_to_bp_csv(
+        args.source_path,
+        args.destination_path,
+        pixel_sampling=args.pixel_sampling,
+        pixel_sigma=args.pixel_sigma,
+        density_sigma=args.density_sigma,
+        step_vector=1,
+        chromsome_threshold=args.threshold,
+        reject_multiple_blobs=False,
+        workers=args.workers,
+        prefetch=args.prefetch,
+        resume=args.resume,
+        store_name=args.store_name,
+        timeout=args.timeout,
+        shard=args.shard)
@@ -6,13 +6,19 @@ import matplotlib.pyplot as plt
 import cv2 as cv
 import sys
 
-from .scripts.banding_pattern_extraction import get_banding_pattern
+from scripts.banding_pattern_extraction import get_banding_pattern
+from scripts.banding_pattern_statistics import write_length_statistics
+from scripts.lib.result_cache import ResultCache
+from scripts.lib.sharding import parse_shard, in_shard, sharded_path, write_shard_marker, remove_shard_marker
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Extracts Statistics of the banding patterns from chromosome images in a give folder.')
     parser.add_argument('-s', '--source_path', help='source path', required=True)
     parser.add_argument('-d', '--destination_path', help='destination path', required=True)
+    parser.add_argument('--cache_dir', help='folder of a persistent result cache, reused across runs', default=None)
+    parser.add_argument('--cache_size', help='maximum size of the result cache in MB', type=int, default=1024)
+    parser.add_argument('--shard', help='Only process shard i of N (zero based), given as i/N', type=parse_shard, default=None)
 
     args = parser.parse_args()
     source_path = args.source_path
@@ -22,12 +28,25 @@ if __name__ == "__main__":
 
     os.makedirs(saving_path, exist_ok=True)
 
+    cache = None
+    if args.cache_dir is not None:
+        cache = ResultCache(args.cache_dir, max_size=args.cache_size * 2**20)
+
+    # Each shard writes its own outputs, e.g. "all.shard-0-of-4.csv", see merge_shards.py --statistics
+    shard = args.shard
+    types_path = sharded_path(saving_path + "/types.csv", shard)
+    all_path = sharded_path(saving_path + "/all.csv", shard)
+    if shard is not None:
+        remove_shard_marker(types_path)
+        remove_shard_marker(all_path)
+
     # Statistics By Type
     if(os.path.isdir(data_path)):
 
         lens = []
         i = 0
-        f = open(saving_path + "/types.csv",'x')
+        types_total = 0
+        f = open(types_path,'x')
         for type in range(1,24):
             lens = []
             max_bp  = 0
@@ -36,19 +55,26 @@ if __name__ == "__main__":
             total   = 0
             for filename in os.listdir(data_path):
         
+                if not in_shard(filename, shard):
+                    continue
+
                 if filename.endswith(".png") and filename.startswith(str(type)+'_'): #by type
                 #if filename.endswith(".png"):
 
                     print('Processing: ' + filename)
                     img_path = data_path + '/' + filename
                     img = cv.imread(img_path, 0)
-                    results = get_banding_pattern(img, chromsome_threshold=254)
+                    results = get_banding_pattern(img, chromsome_threshold=254, cache=cache)
                     #print(results['binarized_banding_pattern'])
                     
                     if(not results['error']):
                         lens.append(len(results['binarized_banding_pattern']))
                         i = i+1
 
+            if not lens: # e.g. no file of this type in the shard
+                print('TYPE '+ str(type) + ': no banding patterns')
+                continue
+
             max_bp  = max(lens)
             min_bp  = min(lens)
             mean_bp = np.mean(lens)
@@ -60,25 +86,21 @@ if __name__ == "__main__":
             print('mean = ' + str(mean_bp))
             print('total = ' + str(total))
             # save to file
-            f.write('TYPE '+ str(type) + '\n')
-            f.write('----------\n')
-            f.write('max = ' + str(max_bp) + '\n')
-            f.write('min = ' + str(min_bp) + '\n')
-            f.write('mean = ' + str(mean_bp) + '\n')
-            f.write('total = ' + str(total) + '\n')
-            f.write('Lengths vector:' + '\n')
-            f.write(str(lens) + '\n')
-            f.write('\n')
+            write_length_statistics(f, lens, 'TYPE '+ str(type))
+            types_total += total
             
         f.close()
 
+        if shard is not None:
+            write_shard_marker(types_path, shard, total=types_total)
+
 
     # Statistics by All images
     if(os.path.isdir(data_path)):
         
         lens = []
         i = 0
-        f = open(saving_path + "/all.csv",'x')
+        f = open(all_path,'x')
 
         max_bp  = 0
         min_bp  = 0
@@ -87,22 +109,26 @@ if __name__ == "__main__":
 
         for filename in os.listdir(data_path):
         
+            if not in_shard(filename, shard):
+                continue
+
             #if filename.endswith(".png") and filename.startswith(str(type)+'_'): #by type
             if filename.endswith(".png"):
 
                 print('Processing: ' + filename)
                 img_path = data_path + '/' + filename
                 img = cv.imread(img_path, 0)
-                results = get_banding_pattern(img, chromsome_threshold=254)
+                results = get_banding_pattern(img, chromsome_threshold=254, cache=cache)
                 #print(results['binarized_banding_pattern'])
                     
                 if(not results['error']):
                     lens.append(len(results['binarized_banding_pattern']))
                     i = i+1
 
-        max_bp  = max(lens)
-        min_bp  = min(lens)
-        mean_bp = np.mean(lens)
+        if lens: # a shard may not contain any banding pattern
+            max_bp  = max(lens)
+            min_bp  = min(lens)
+            mean_bp = np.mean(lens)
         total   = len(lens)
         print('All ')
         print('-----------------')
@@ -111,16 +137,16 @@ if __name__ == "__main__":
         print('mean = ' + str(mean_bp))
         print('total = ' + str(total))
         # save to file
-        f.write('max = ' + str(max_bp) + '\n')
-        f.write('min = ' + str(min_bp) + '\n')
-        f.write('mean = ' + str(mean_bp) + '\n')
-        f.write('total = ' + str(total) + '\n')
-        f.write('Lengths vector:' + '\n')
-        f.write(str(lens) + '\n')
-        f.write('\n')
+        write_length_statistics(f, lens)
 
         f.close()
 
+        if shard is not None:
+            write_shard_marker(all_path, shard, total=total)
+
+        if cache is not None:
+            print('Cache:', cache.stats())
+
         print('Done!')
 
     else:
@@ -1,42 +1,28 @@
 import argparse
 import os
-import cv2 as cv
-import traceback 
 
-from .scripts.chromosome_segmentation import get_segmented_chromosome
+from scripts.chromosome_segmentation_from_folder import folder_to_segmentations
 
 if __name__ == "__main__":
 
-    parser = argparse.ArgumentParser(description='Extracts the banding patterns from chromosome images from a folder.')
+    parser = argparse.ArgumentParser(description='Creates the banding pattern segmentations of chromosome images from a folder.')
     parser.add_argument('-s', '--source_path', help='source path', required=True)
     parser.add_argument('-d', '--destination_path', help='destination path', required=True)
-
+    parser.add_argument('--extraction_size', help='Size at which the banding pattern is extracted, e.g. 128', type=int, nargs='?', default=None)
+    parser.add_argument('--workers', help='Number of segmentation processes', type=int, nargs='?', default=os.cpu_count())
+    parser.add_argument('--writers', help='Number of threads that write the segmentations', type=int, nargs='?', default=2)
+    parser.add_argument('--resume', help='Skip files whose segmentation already exists', action='store_true')
+    parser.add_argument('--stack_name', help='Also stack all segmentations into a npy file of this name, e.g. segmentations.npy', default=None)
 
     args = parser.parse_args()
-    source_path = args.source_path
-    destination_path = args.destination_path
-
-    file_list = os.listdir(source_path)
-    banding_patterns = {}
-
-    amount = len(file_list)
-    
-    # Extract all patterns, if possible, and save into dict
-    for i in range(amount):
-        file_name = file_list[i]
-        if (i+1) % 100 == 0:
-            print("Finished:", i / amount)
-        file_path = os.path.join(source_path, file_name)
-        save_path = os.path.join(destination_path, file_name)
-        
-        img = cv.imread(file_path, 0)
-
-        try:
-            bp_segmentation = get_segmented_chromosome(img)
-            cv.imwrite(save_path, bp_segmentation)
-            
 
-        except Exception as e:
-            print("Extraction of '{0}' failed, due to: {1}".format(file_name, e))
-            traceback.print_exc()
+    segmented, failed = folder_to_segmentations(
+        args.source_path,
+        args.destination_path,
+        extraction_size=args.extraction_size,
+        workers=args.workers,
+        writers=args.writers,
+        resume=args.resume,
+        stack_name=args.stack_name)
 
+    print("Segmented {0} files, {1} failed.".format(segmented, failed))
@@ -0,0 +1,20 @@
+import argparse
+from time import time
+
+from scripts.lib.pattern_store import csv_to_pattern_store, PatternStore
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Converts a banding pattern csv into a memory mappable binary store.')
+    parser.add_argument('-s', '--source_path', help='path of the csv file', required=True)
+    parser.add_argument('-d', '--destination_path', help='path of the store file', required=True)
+
+    args = parser.parse_args()
+
+    t1 = time()
+    count = csv_to_pattern_store(args.source_path, args.destination_path)
+    print("Converted {0} patterns in {1:.2f}s".format(count, time() - t1))
+
+    t1 = time()
+    store = PatternStore(args.destination_path)
+    print("Opened store with {0} patterns in {1:.4f}s".format(len(store), time() - t1))
@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+
+from scripts.extraction_client import extract_remote, DEFAULT_URL
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Extracts a banding pattern with a running extraction daemon, see extraction_server.py.')
+    parser.add_argument('-p', '--path', help='input image', required=True)
+    parser.add_argument('--url', help='url of the daemon', default=DEFAULT_URL)
+    parser.add_argument('--send_image', help='send the image file instead of its path', action='store_true')
+    parser.add_argument('--pixel_sampling', help='Sub sampling rate, i.e. keep every x-th pixel from the interpolated skeleton', type=int, nargs='?', default=8)
+    parser.add_argument('--density_sigma', help='Sigma for Gaussian filter of the density profiles', type=int, nargs='?', default=2)
+    parser.add_argument('--threshold', help='Segmentation threshold', type=int, nargs='?', default=254)
+    parser.add_argument('--size', help='Size of the  banding pattern, extraction will be resized accordingly', type=int, nargs='?', default=None)
+    parser.add_argument('--timeout', help='Time budget in seconds', type=float, nargs='?', default=None)
+
+    args = parser.parse_args()
+
+    results = extract_remote(
+        os.path.abspath(args.path),
+        args.url,
+        send_image=args.send_image,
+        timeout=args.timeout,
+        pixel_sampling=args.pixel_sampling,
+        density_sigma=args.density_sigma,
+        chromsome_threshold=args.threshold,
+        size=args.size)
+
+    if results['error']:
+        print(results['error_message'])
+        sys.exit(1)
+
+    print(" ".join(str(x) for x in results['binarized_banding_pattern']))
@@ -0,0 +1,14 @@
+import argparse
+
+from scripts.extraction_server import serve, DEFAULT_HOST, DEFAULT_PORT
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Runs a local extraction daemon with a warm process pool, see extraction_client.py.')
+    parser.add_argument('--host', help='host to bind to', default=DEFAULT_HOST)
+    parser.add_argument('--port', help='port to bind to', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', help='number of extraction processes', type=int, default=None)
+
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers)
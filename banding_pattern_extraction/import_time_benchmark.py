@@ -0,0 +1,29 @@
+import argparse
+import os
+
+from scripts.import_benchmark import record_import_time, DEFAULT_STATEMENT
+
+if __name__ == "__main__":
+
+    default_history = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_times.jsonl')
+
+    parser = argparse.ArgumentParser(description='Measures the import time of the extraction path with "python -X importtime" and tracks it in a history file.')
+    parser.add_argument('--statement', help='python statement to measure', default=DEFAULT_STATEMENT)
+    parser.add_argument('--history', help='history file, one json record per run', default=default_history)
+    parser.add_argument('--repeats', help='interpreter runs, the median is reported', type=int, default=5)
+    parser.add_argument('--top', help='number of slowest modules to show', type=int, default=10)
+
+    args = parser.parse_args()
+
+    record, previous = record_import_time(args.history, args.statement, args.repeats, args.top)
+
+    print("Import time: {0:.1f} ms ({1} modules)".format(record['total_ms'], record['modules']))
+    if previous is not None:
+        print("Previous:    {0:.1f} ms ({1}, commit {2})".format(previous['total_ms'], previous['date'], previous['commit']))
+
+    print("Slowest modules:")
+    for name, ms in record['slowest']:
+        print("{0:>10.1f} ms  {1}".format(ms, name))
+
+    if record['unwanted']:
+        print("Warning, unwanted modules are imported:", ", ".join(record['unwanted']))
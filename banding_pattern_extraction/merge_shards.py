@@ -0,0 +1,21 @@
+import argparse
+
+from scripts.merge_shards import merge_shards, merge_statistics_shards
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Merges the shard outputs of banding_pattern_extraction_from_folder.py into a single csv or binary pattern store, or those of banding_pattern_statistics.py.')
+    parser.add_argument('-s', '--source_path', help='folder of the shard outputs', required=True)
+    parser.add_argument('-d', '--destination_path', help='path of the merged csv or store, the destination folder with --statistics', required=True)
+    parser.add_argument('--csv_name', help='csv name of the shards', default='banding_patterns.csv')
+    parser.add_argument('--format', help='output format', choices=['csv', 'store'], default='csv')
+    parser.add_argument('--statistics', help='merge the types.csv and all.csv shards of banding_pattern_statistics.py', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.statistics:
+        types_total, all_total = merge_statistics_shards(args.source_path, args.destination_path)
+        print("Merged the statistics of {0} banding patterns by type and {1} in total".format(types_total, all_total))
+    else:
+        count, failed = merge_shards(args.source_path, args.destination_path, args.csv_name, args.format)
+        print("Merged {0} banding patterns, {1} files failed".format(count, failed))
@@ -0,0 +1,33 @@
+import argparse
+import os
+
+from scripts.parameter_sweep import parameter_sweep, sweep_to_csv
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Extracts the banding patterns of a folder of chromosome images for a grid of parameters.')
+    parser.add_argument('-s', '--source_path', help='source path', required=True)
+    parser.add_argument('-d', '--destination_path', help='path of the resulting csv file', required=True)
+    parser.add_argument('--pixel_sampling', help='Sub sampling rates to try', type=int, nargs='+', default=[8])
+    parser.add_argument('--density_sigma', help='Sigmas of the density profile filter to try', type=float, nargs='+', default=[2])
+    parser.add_argument('--threshold', help='Segmentation thresholds to try', type=int, nargs='+', default=[254])
+    parser.add_argument('--size', help='Size of the banding patterns', type=int, default=None)
+    parser.add_argument('--workers', help='number of processes', type=int, default=1)
+
+    args = parser.parse_args()
+
+    imgs = {}
+    for file_name in sorted(os.listdir(args.source_path)):
+        imgs[file_name] = os.path.join(args.source_path, file_name)
+
+    grid = {
+        'chromsome_threshold': args.threshold,
+        'pixel_sampling': args.pixel_sampling,
+        'density_sigma': args.density_sigma,
+    }
+
+    rows = parameter_sweep(imgs, grid, workers=args.workers, size=args.size)
+    sweep_to_csv(rows, args.destination_path)
+
+    print("Combinations:", len(rows), "Errors:", sum(row['error'] for row in rows))
+    print("Time spent:", sum(row['time'] for row in rows))
@@ -0,0 +1,170 @@
+import os
+import asyncio
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .banding_pattern_extraction import get_banding_pattern
+from .batch_extraction import _load_image, _enumerate_images
+
+def _extract_task(img, params):
+    """ Executor helper, loads the image if needed and extracts its banding pattern
+    """
+    return get_banding_pattern(_load_image(img), **params)
+
+class AsyncExtractor:
+    """ Asyncio front end for banding pattern extraction, backed by a managed process or thread pool
+
+    Extractions run in the pool, so the event loop is never blocked. At most max_concurrency extractions
+    are submitted at the same time, further calls wait without occupying the pool. Use it as an async
+    context manager or call close() to shut the pool down.
+
+    Arguments:
+        workers: optional, number of processes or threads, defaults to the number of cpus.
+        executor: optional, 'process' or 'thread'.
+        max_concurrency: optional, maximum number of extractions submitted to the pool at the same
+            time, defaults to the number of workers.
+    """
+
+    def __init__(self, workers=None, executor='process', max_concurrency=None):
+        if workers is None:
+            workers = os.cpu_count()
+
+        if executor == 'process':
+            self.executor = ProcessPoolExecutor(workers)
+        elif executor == 'thread':
+            self.executor = ThreadPoolExecutor(workers)
+        else:
+            raise ValueError("Unknown executor '{0}', choose 'process' or 'thread'.".format(executor))
+
+        self.pickle_conform_results = executor == 'process'
+        self.max_concurrency = max_concurrency if max_concurrency is not None else workers
+        self._semaphores = weakref.WeakKeyDictionary() # one per event loop, a semaphore is bound to its loop
+
+    async def extract(self, img, timeout=None, **params):
+        """ Extracts the banding pattern of a single image
+
+        Arguments:
+            img: the chromosome image or a path to it.
+            timeout: optional, seconds after which asyncio.TimeoutError is raised. An extraction that
+                already runs in a process can not be interrupted, its result is discarded.
+            params**: see get_banding_pattern(), pickle_conform_results is set for process pools.
+
+        Returns:
+            The results, see get_banding_pattern()
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        params.setdefault('pickle_conform_results', self.pickle_conform_results)
+
+        async with self._semaphores[loop]:
+            future = loop.run_in_executor(self.executor, _extract_task, img, params)
+            return await asyncio.wait_for(future, timeout)
+
+    async def iter_extract(self, source, ordered=False, timeout=None, **params):
+        """ Extracts a batch of banding patterns and yields the results as soon as they are finished
+
+        The source is consumed lazily, at most max_concurrency extractions are pending at any time.
+        Use it with "async for key, result in extractor.iter_extract(...)".
+
+        Arguments:
+            source: iterable of images or image paths, or a dictionary of key and image (or path).
+            ordered: optional, yield the results in the order of the source.
+            timeout: optional, seconds per image. Timed out images yield an error result.
+            params**: see get_banding_pattern()
+
+        Returns:
+            Async generator of tuples of key and result. The key is the index of the image in the
+            source, or its key if the source is a dictionary.
+        """
+        if isinstance(source, dict):
+            tasks = iter(source.items())
+        else:
+            tasks = _enumerate_images(source)
+
+        pending = {}
+        buffered = {}
+        order = []
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(pending) + len(buffered) < self.max_concurrency:
+                    try:
+                        key, img = next(tasks)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(self.extract(img, timeout, **params))
+                    pending[task] = key
+                    order.append(key)
+
+                if not pending and not buffered:
+                    break
+
+                if pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        key = pending.pop(task)
+                        try:
+                            buffered[key] = task.result()
+                        except asyncio.TimeoutError:
+                            buffered[key] = {
+                                'error': True,
+                                'error_message': 'Timeout after {0} seconds'.format(timeout),
+                                'stack_trace': ''
+                            }
+
+                if ordered:
+                    while order and order[0] in buffered:
+                        key = order.pop(0)
+                        yield key, buffered.pop(key)
+                else:
+                    for key in list(buffered.keys()):
+                        yield key, buffered.pop(key)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self, wait=True):
+        """ Shuts the pool down
+
+        Arguments:
+            wait: optional, whether to wait for running extractions.
+        """
+        self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close(wait=False)
+
+# Extractor that is shared by extract_async() and iter_extract_async()
+_default_extractor = None
+
+def _get_default_extractor():
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = AsyncExtractor()
+
+    return _default_extractor
+
+async def extract_async(img, timeout=None, **params):
+    """ Extracts a banding pattern without blocking the event loop, using a shared process pool
+
+    Arguments:
+        img: the chromosome image or a path to it.
+        timeout: optional, seconds after which asyncio.TimeoutError is raised.
+        params**: see get_banding_pattern()
+
+    Returns:
+        The results, see get_banding_pattern()
+    """
+    return await _get_default_extractor().extract(img, timeout, **params)
+
+def iter_extract_async(source, ordered=False, timeout=None, **params):
+    """ Async batch variant of extract_async(), see AsyncExtractor.iter_extract()
+    """
+    return _get_default_extractor().iter_extract(source, ordered, timeout, **params)
@@ -0,0 +1,165 @@
+import os
+import csv
+from multiprocessing import Pool
+import numpy as np
+import cv2 as cv
+
+from .batch_extraction import _load_image
+from .chromosome_geometry import ChromosomeGeometry
+from .lib.utils import generate_random_banding_patterns
+
+def _image_stem(name, img):
+    """ Returns the base of the output file names of an image, the file name for paths and the name otherwise
+    """
+    if isinstance(img, (str, os.PathLike)):
+        return os.path.splitext(os.path.basename(os.fspath(img)))[0]
+
+    return str(name)
+
+def random_patterns(count, length, seed):
+    """ Generates random Perlin noise banding patterns of a fixed length with their own random state
+
+    The global numpy random state is restored afterwards, so the patterns only depend on the seed.
+
+    Arguments:
+        count: number of patterns.
+        length: length of the patterns.
+        seed: seed of the random state.
+
+    Returns:
+        2D int8 array, one pattern per row.
+    """
+    state = np.random.get_state()
+    try:
+        np.random.seed(seed)
+        patterns = generate_random_banding_patterns(count, length, [[length, 0]])[0]
+    finally:
+        np.random.set_state(state)
+
+    return patterns.astype(np.int8)
+
+def augment_image(name, img, count, seed, extraction_size=None, destination_path=None, params=None):
+    """ Imposes multiple random banding patterns onto a single chromosome, extracting its geometry only once
+
+    Arguments:
+        name: identifier of the image, used in the result and the output file names.
+        img: the chromosome image, or a path to it.
+        count: number of random patterns.
+        seed: seed of the random patterns.
+        extraction_size: optional, see ChromosomeGeometry.from_image()
+        destination_path: optional, folder to which the images are written as "<image>_<i>.png" instead
+            of returning them. Uses the file name of image paths, otherwise the name.
+        params: optional, dictionary of extraction parameters, see get_banding_pattern()
+
+    Returns:
+        Dictionary with the keys 'image', 'patterns' (2D array, one pattern per row), 'images' (3D array
+        or None if written to disk), 'paths' (list of written files or None), 'error' and 'error_message'.
+    """
+    row = {'image': name, 'patterns': None, 'images': None, 'paths': None, 'error': False, 'error_message': ''}
+    try:
+        geometry = ChromosomeGeometry.from_image(_load_image(img), extraction_size, **(params or {}))
+        row['patterns'] = random_patterns(count, len(geometry.banding_pattern), seed)
+        images = geometry.render_batch(row['patterns'])
+    except Exception as e:
+        row['error'] = True
+        row['error_message'] = str(e) or type(e).__name__
+        return row
+
+    if destination_path is None:
+        row['images'] = images
+    else:
+        stem = _image_stem(name, img)
+        row['paths'] = [os.path.join(destination_path, "{0}_{1}.png".format(stem, i)) for i in range(count)]
+        for path, image in zip(row['paths'], images):
+            cv.imwrite(path, image)
+
+    return row
+
+def _augment_task(args):
+    """ Pool helper, unpacks the arguments of augment_image() """
+    return augment_image(*args)
+
+def augment_chromosomes(imgs, counts, workers=1, seed=0, extraction_size=None, out=None, destination_path=None, **params):
+    """ Imposes many random Perlin noise banding patterns onto many chromosome shapes, e.g. for synthetic training data
+
+    Each image is handled by one task, which extracts the geometry once, generates all of its patterns
+    in one batch and renders them without a new extraction. Images are distributed over multiple
+    processes. Every image gets its own seed derived from the seed, so the results are reproducible and
+    do not depend on the number of workers.
+
+    Arguments:
+        imgs: dictionary of name and image (or image path), or a list of images (or paths).
+        counts: number of patterns per image, a single number or one per image.
+        workers: optional, number of processes.
+        seed: optional, seed of the random patterns.
+        extraction_size: optional, see ChromosomeGeometry.from_image()
+        out: optional, preallocated array of shape (total count, height, width), into which the images
+            are rendered in the order of imgs. The images are rendered at the shape of their source
+            image, so all images have to be of this height and width. The entries of failed images
+            (including images of another shape that were passed as path) are left untouched.
+        destination_path: optional, folder to which the images are written, see augment_image(). The
+            patterns are saved as "augmented_patterns.csv" in the same folder, in the format of
+            banding_pattern_extraction_from_folder_to_csv().
+        params**: see get_banding_pattern()
+
+    Returns:
+        List of dictionaries, one per image in the order of imgs, see augment_image(). With out, 'images'
+        is None and 'offset' is the index of the first image in out.
+    """
+    if not isinstance(imgs, dict):
+        imgs = dict(enumerate(imgs))
+
+    if np.ndim(counts) == 0:
+        counts = [counts] * len(imgs)
+    if len(counts) != len(imgs):
+        raise ValueError("Got {0} counts for {1} images.".format(len(counts), len(imgs)))
+
+    if out is not None and destination_path is not None:
+        raise ValueError("Either render into out or write to destination_path, not both.")
+
+    offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+    if out is not None and len(out) < offsets[-1]:
+        raise ValueError("The output array holds {0} images, but {1} are rendered.".format(len(out), offsets[-1]))
+    if out is not None:
+        # Images that were passed as path are checked once they are rendered
+        shapes = set(tuple(img.shape[:2]) for img in imgs.values() if hasattr(img, 'shape'))
+        if shapes - {tuple(out.shape[1:3])}:
+            raise ValueError("The output array holds images of shape {0}, but images of shape {1} are rendered.".format(tuple(out.shape[1:3]), sorted(shapes - {tuple(out.shape[1:3])})))
+    if destination_path is not None:
+        os.makedirs(destination_path, exist_ok=True)
+
+    seeds = [s.generate_state(1)[0] for s in np.random.SeedSequence(seed).spawn(len(imgs))]
+    tasks = [(name, img, int(count), image_seed, extraction_size, destination_path, params)
+        for (name, img), count, image_seed in zip(imgs.items(), counts, seeds)]
+
+    def collect(image_rows):
+        rows = []
+        for offset, row in zip(offsets, image_rows):
+            if out is not None:
+                row['offset'] = int(offset)
+                if not row['error'] and row['images'].shape[1:] != out.shape[1:]:
+                    row['error'] = True
+                    row['error_message'] = "Rendered images of shape {0} do not fit into the output array of shape {1}.".format(row['images'].shape[1:], out.shape[1:])
+                if not row['error']:
+                    out[offset:offset + len(row['images'])] = row['images']
+                row['images'] = None # only the renderings of one image are held in memory at a time
+            rows.append(row)
+
+        return rows
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            rows = collect(pool.imap(_augment_task, tasks, chunksize=1))
+    else:
+        rows = collect(_augment_task(task) for task in tasks)
+
+    if destination_path is not None:
+        with open(os.path.join(destination_path, 'augmented_patterns.csv'), 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(["file_name", "banding_pattern"])
+            for row in rows:
+                if not row['error']:
+                    for path, pattern in zip(row['paths'], row['patterns']):
+                        writer.writerow([os.path.basename(path), " ".join(str(x) for x in pattern)])
+
+    return rows
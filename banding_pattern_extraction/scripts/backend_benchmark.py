@@ -0,0 +1,56 @@
+from time import time
+import cv2 as cv
+
+from .batch_extraction import get_banding_pattern_multi_process
+
+def benchmark_backends(img, sizes, batch_size=64, workers=4, repeats=1, **args):
+    """ Compares the thread and the process backend of the batch extraction for different image sizes
+
+    Arguments:
+        img: a chromosome image, it is resized to each of the sizes.
+        sizes: list of (square) image sizes.
+        batch_size: optional, number of images per batch.
+        workers: optional, number of threads or processes.
+        repeats: optional, number of timed repetitions per size and backend, the best one is reported.
+        args**: see get_banding_pattern_multi_process()
+
+    Returns:
+        List of dictionaries with the image size, the images per second of both backends and the
+        faster backend ('faster').
+    """
+    rows = []
+    for size in sizes:
+        imgs = [cv.resize(img, (size, size))] * batch_size
+
+        row = {'size': size}
+        for backend in ['thread', 'process']:
+            best = float('inf')
+            for _ in range(repeats):
+                t1 = time()
+                get_banding_pattern_multi_process(imgs, workers, backend=backend, **args)
+                best = min(best, time() - t1)
+            row[backend] = batch_size / best
+        row['faster'] = 'process' if row['process'] > row['thread'] else 'thread'
+
+        rows.append(row)
+
+    return rows
+
+def crossover_size(rows):
+    """ Determines the image size from which on processes are faster than threads
+
+    Arguments:
+        rows: results of benchmark_backends()
+
+    Returns:
+        The smallest benchmarked size for which processes are faster at this and all larger sizes.
+        None if threads are faster at the largest size, even if processes won at smaller sizes, so
+        check the winner of each size (see benchmark_backends()) in that case.
+    """
+    crossover = None
+    for row in sorted(rows, key=lambda row: row['size'], reverse=True):
+        if row['process'] <= row['thread']:
+            break
+        crossover = row['size']
+
+    return crossover
@@ -1,67 +1,176 @@
 import argparse
 import os
-import cv2 as cv
 import csv
-import matplotlib.pyplot as plt
-from scipy.ndimage import binary_fill_holes
-import traceback 
+from time import time
 
-from .banding_pattern_extraction import get_banding_pattern
+from .batch_extraction import iter_banding_patterns, prefetch_images, extract_with_time_budget
+from .lib.pattern_store import csv_to_pattern_store
+from .lib.sharding import in_shard, sharded_path, write_shard_marker, remove_shard_marker
 
-def folder_to_bp_csv(source_path, destination_path, extraction_size=None, identifier=None, csv_name=None, pixel_sampling=10, pixel_sigma=2, density_sigma=2, step_vector=1, chromsome_threshold=254, reject_multiple_blobs=False):
+def _finished_file_names(csv_path):
+    """ Reads the file names of an existing banding pattern csv, e.g. to resume an extraction
+
+    A partially written last row (e.g. after a crash) is removed from the file.
+
+    Arguments:
+        csv_path: path to the csv file.
+
+    Returns:
+        Set of file names.
+    """
+    with open(csv_path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        while end > 0:
+            start = max(end - 2**16, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                break
+            end = start
+        else:
+            f.truncate(0)
+
+    with open(csv_path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader, None) # header
+        return set(row[0] for row in reader if len(row) == 2)
+
+def _compact_error_log(error_path, extracted, identifier=None):
+    """ Removes outdated entries from an error log, e.g. after a resumed extraction appended to it
+
+    Keeps the last error of each file and drops files that were extracted since.
+
+    Arguments:
+        error_path: path of the error log.
+        extracted: set of the file names in the banding pattern csv.
+        identifier: optional, see folder_to_bp_csv()
+    """
+    with open(error_path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader, None) # header
+        errors = dict(row for row in reader if len(row) == 2)
+
+    with open(error_path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(["file_name", "error_message"])
+        writer.writerows((file_name, message) for file_name, message in errors.items() if output_file_name(file_name, identifier) not in extracted)
+
+def output_file_name(file_name, identifier=None):
+    """ Name of a file in the banding pattern csv, the identifier is removed from the file name
+    """
+    if identifier is not None:
+        return file_name.replace(identifier, '')
+    return file_name
+
+def folder_to_bp_csv(source_path, destination_path, extraction_size=None, identifier=None, csv_name=None, pixel_sampling=10, pixel_sigma=2, density_sigma=2, step_vector=1, chromsome_threshold=254, reject_multiple_blobs=False, cache=None, workers=1, prefetch=16, resume=False, store_name=None, timeout=None, shard=None):
     """ Extracts the banding patterns from chromosomes in a folder to a csv file
 
+    Images are decoded ahead of time by a small thread pool. With more than one worker, the
+    extraction runs in a process pool. The files are processed in sorted order, so the output is
+    deterministic. Each row is written and flushed as soon as its file is finished. Files that
+    could not be extracted are logged with their error message in "<csv_name>_errors.csv".
+
     Arguments:
         source_path: path of the folder.
         destination_path: path to csv.
         exctation_size: size at which the banding pattern shall be extracted
         identifier: file identifier (only those will be considered). E.g. "23" only files with "23" in ther name will be extracted
         csv_name: name of the csv file.
+        cache: optional, a ResultCache, so unchanged files are not extracted again.
+        workers: optional, number of extraction processes.
+        prefetch: optional, number of images that are decoded ahead of the extraction.
+        resume: optional, skip files that are already in an existing csv and append the new rows.
+            Previously failed files are retried, the error log keeps the last error of each file
+            that still fails.
+        store_name: optional, name of a binary pattern store, see PatternStore. It is created from the
+            csv once all files are finished.
+        timeout: optional, time budget per image in seconds. Files that exceed it are logged as failed.
+        shard: optional, tuple of shard index and number of shards. Only the files of the shard are
+            extracted, partitioned by a stable hash of their names, and the outputs are named after the
+            shard, e.g. "banding_patterns.shard-0-of-4.csv". A finished shard writes a completion
+            marker, see merge_shards.py.
         args**: see banding_pattern_extraction.py
 
     """
-    
-    file_list = os.listdir(source_path)
-    banding_patterns = {}
+    if csv_name == None:
+        csv_name = 'banding_patterns.csv'
+    csv_path = sharded_path(os.path.join(destination_path, csv_name), shard)
+    error_path = os.path.splitext(csv_path)[0] + '_errors.csv'
+
+    resume = resume and os.path.exists(csv_path)
+    finished = _finished_file_names(csv_path) if resume else set()
+    if shard is not None:
+        remove_shard_marker(csv_path)
+
+    file_list = sorted(os.listdir(source_path))
+    if identifier != None:
+        file_list = [file_name for file_name in file_list if identifier in file_name]
+    file_list = [file_name for file_name in file_list if in_shard(file_name, shard)]
+    file_list = [file_name for file_name in file_list if output_file_name(file_name, identifier) not in finished]
+    file_paths = [os.path.join(source_path, file_name) for file_name in file_list]
 
     amount = len(file_list)
+    params = {
+        "pixel_sampling": pixel_sampling,
+        "pixel_sigma": pixel_sigma,
+        "density_sigma": density_sigma,
+        "step_vector": step_vector,
+        "chromsome_threshold": chromsome_threshold,
+        "reject_multiple_blobs": reject_multiple_blobs,
+        "cache": cache,
+        "pickle_conform_results": True,
+    }
+
+    if resume:
+        print("Resuming, skipping {0} finished files".format(len(finished)))
 
-    # Extract all patterns, if possible, and save into dict
-    for i in range(amount):
-        file_name = file_list[i]
+    imgs = prefetch_images(file_paths, extraction_size, prefetch)
+    if workers > 1:
+        results = iter_banding_patterns(imgs, workers, ordered=True, timeout=timeout, **params)
+    else:
+        results = ((i, extract_with_time_budget(img, timeout, **params)) for i, img in enumerate(imgs))
 
-        if identifier != None and identifier not in file_name:
-            continue
+    extracted = len(finished)
+    failed = 0
+    mode = 'a' if resume else 'w'
+    with open(csv_path, mode) as f, open(error_path, mode) as error_f:
+        writer = csv.writer(f)
+        error_writer = csv.writer(error_f)
 
-        if (i+1) % 100 == 0:
-            print("Finished:", i / amount)
-        file_path = os.path.join(source_path, file_name)
-        img = cv.imread(file_path, 0)
-        if extraction_size is not None:
-            img = cv.resize(img, (extraction_size, extraction_size))
+        # header
+        if f.tell() == 0:
+            writer.writerow(["file_name", "banding_pattern"])
+        if error_f.tell() == 0:
+            error_writer.writerow(["file_name", "error_message"])
+
+        # Extract all patterns, if possible, and write them as soon as they are finished
+        t1 = time()
+        for i, bp in results:
+            file_name = file_list[i]
+
+            if (i+1) % 100 == 0:
+                print("Finished: {0}/{1} ({2:.1f} images/s)".format(i + 1, amount, (i + 1) / (time() - t1)))
 
-        try:
-            bp = get_banding_pattern(img, pixel_sampling, pixel_sigma, density_sigma, step_vector, chromsome_threshold=chromsome_threshold, reject_multiple_blobs=reject_multiple_blobs)
             if not bp['error']:
-                banding_patterns[file_name] = bp['binarized_banding_pattern']
+                bp_string = [str(x) for x in bp['binarized_banding_pattern']]
+                bp_string = " ".join(bp_string)
+                writer.writerow([output_file_name(file_name, identifier), bp_string])
+                f.flush()
+                extracted += 1
             else:
-                raise bp["error_message"]
-        except Exception as e:
-            print("Extraction of '{0}' failed, due to: {1}".format(file_name, e))
-            traceback.print_exc()
+                print("Extraction of '{0}' failed, due to: {1}".format(file_name, bp["error_message"]))
+                error_writer.writerow([file_name, bp["error_message"]])
+                error_f.flush()
+                failed += 1
 
-    # Save dict with banding patterns
-    if csv_name == None:
-        csv_name = 'banding_patterns.csv'
-    source_file = os.path.join(destination_path, csv_name)
-    with open(source_file, 'w') as f:
-        writer = csv.writer(f)
+    # Previously failed files were retried and logged again
+    if resume:
+        _compact_error_log(error_path, _finished_file_names(csv_path), identifier)
 
-        # header
-        writer.writerow(["file_name", "banding_pattern"])
-        for file_name, bp in banding_patterns.items():
-            bp_string = [str(x) for x in bp]
-            bp_string = " ".join(bp_string)
-            if identifier is not None:
-                file_name = file_name.replace(identifier, '')
-            writer.writerow([file_name, bp_string])
\ No newline at end of file
+    if store_name is not None:
+        csv_to_pattern_store(csv_path, sharded_path(os.path.join(destination_path, store_name), shard))
+
+    if shard is not None:
+        write_shard_marker(csv_path, shard, extracted=extracted, failed=failed, identifier=identifier)
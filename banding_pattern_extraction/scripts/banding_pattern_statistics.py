@@ -0,0 +1,43 @@
+import json
+import numpy as np
+
+def write_length_statistics(f, lens, title=None):
+    """ Writes the statistics of banding pattern lengths in the format of banding_pattern_statistics.py
+
+    Arguments:
+        f: the opened text file.
+        lens: list of banding pattern lengths.
+        title: optional, section title, e.g. "TYPE 1".
+    """
+    if title is not None:
+        f.write(title + '\n')
+        f.write('----------\n')
+    if lens:
+        f.write('max = ' + str(max(lens)) + '\n')
+        f.write('min = ' + str(min(lens)) + '\n')
+        f.write('mean = ' + str(np.mean(lens)) + '\n')
+    f.write('total = ' + str(len(lens)) + '\n')
+    f.write('Lengths vector:' + '\n')
+    f.write(str(lens) + '\n')
+    f.write('\n')
+
+def read_length_statistics(path):
+    """ Reads the banding pattern lengths of a file written by write_length_statistics()
+
+    Arguments:
+        path: path of the file.
+
+    Returns:
+        Dictionary of section title (None for sections without title) and list of lengths.
+    """
+    sections = {}
+    title = None
+    with open(path, 'r') as f:
+        lines = iter(f.read().splitlines())
+        for line in lines:
+            if line.startswith('TYPE '):
+                title = line
+            elif line == 'Lengths vector:':
+                sections[title] = [int(x) for x in json.loads(next(lines))]
+
+    return sections
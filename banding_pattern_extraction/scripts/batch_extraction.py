@@ -0,0 +1,523 @@
+import os
+import time
+import queue
+import signal
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.pool import ThreadPool
+import numpy as np
+import cv2 as cv
+
+from .banding_pattern_extraction import get_banding_pattern
+from .pipeline import ExtractionTimeout
+from .lib.banding_pattern_utils import banding_points_to_csr, csr_to_banding_points
+from .lib.shared_memory_transport import share_arrays, share_stack, attach_arrays, receive_arrays
+from .lib.scratch_buffers import ScratchBuffers
+
+# Results that can not be placed in shared memory
+NOT_SHAREABLE_KEYS = ['paths', 'longest_path']
+
+# Seconds per image a chunk may exceed its time budget, before its worker process is terminated
+HARD_TIMEOUT_GRACE = 5
+
+# Configuration of a worker process, set once by _init_worker()
+_worker_params = None
+_worker_shared_memory = False
+_worker_timeout = None
+
+# Budget of the running timer, used for the message of ExtractionTimeout
+_timer_timeout = None
+
+# Scratch buffers of each thread of the thread backend
+_thread_local = threading.local()
+
+def _init_worker(params, use_shared_memory=False, timeout=None):
+    """ Pool initializer, receives the extraction parameters once per worker process
+
+    Arguments:
+        params: dictionary of extraction parameters, see get_banding_pattern()
+        use_shared_memory: optional, whether array results are returned via shared memory.
+        timeout: optional, time budget per image in seconds.
+    """
+    global _worker_params, _worker_shared_memory, _worker_timeout
+    _worker_params = params
+    _worker_shared_memory = use_shared_memory
+    _worker_timeout = timeout
+
+def timeout_result(timeout, stage=None):
+    """ Creates the error result of an extraction that exceeded its time budget
+
+    Arguments:
+        timeout: the time budget in seconds.
+        stage: optional, the stage that was running, None if unknown.
+
+    Returns:
+        Results dictionary, see get_banding_pattern()
+    """
+    message = "Timeout after {0} seconds".format(timeout)
+    if stage is not None:
+        message = "{0} in stage '{1}'".format(message, stage)
+
+    return {
+        'error': True,
+        'error_message': message,
+        'stack_trace': '',
+        'stage': stage
+    }
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout("Timeout after {0} seconds".format(_timer_timeout))
+
+def extract_with_time_budget(img, timeout=None, **params):
+    """ Extracts a banding pattern, but gives up once the time budget is exceeded
+
+    The budget is enforced by a SIGALRM timer, so it only applies in the main thread on platforms that
+    support signal.setitimer(), otherwise the extraction runs without budget. Compiled code (e.g. the
+    skeletonization) can not be interrupted, the timeout is raised once it returns. Batch extractions
+    additionally terminate workers that exceed their budget, see iter_banding_patterns().
+
+    Arguments:
+        img: the chromosome image.
+        timeout: optional, time budget in seconds.
+        params**: see get_banding_pattern()
+
+    Returns:
+        The results, see get_banding_pattern(). A timeout is returned as error result, with the stage
+        that was running in 'stage'.
+    """
+    global _timer_timeout
+    if timeout is None or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        return get_banding_pattern(img, **params)
+
+    _timer_timeout = timeout
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return get_banding_pattern(img, **params)
+    except ExtractionTimeout: # fired outside of the pipeline
+        return timeout_result(timeout)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _load_image(img):
+    """ Loads an image lazily, if a path was given instead of an array
+
+    Arguments:
+        img: a chromosome image or the path to it.
+
+    Returns:
+        The grayscale image.
+    """
+    if isinstance(img, (str, os.PathLike)):
+        return cv.imread(os.fspath(img), 0)
+
+    return img
+
+def _share_results(results):
+    """ Moves the array parts of a result into a shared memory block
+
+    Arguments:
+        results: results of get_banding_pattern()
+
+    Returns:
+        The results without arrays, but with the 'shared_memory' descriptor of the block.
+    """
+    arrays = {}
+    shared_results = {}
+    for key, value in results.items():
+        if key in NOT_SHAREABLE_KEYS:
+            continue
+        if key == 'banding_points':
+            arrays['banding_points_indices'], arrays['banding_points_offsets'] = banding_points_to_csr(value)
+        elif isinstance(value, (np.ndarray, list)):
+            arrays[key] = np.asarray(value)
+        else:
+            shared_results[key] = value
+
+    if arrays:
+        shm, shared_results['shared_memory'] = share_arrays(arrays)
+        shm.close()
+
+    return shared_results
+
+def _receive_results(results):
+    """ Restores results of _share_results() in the parent process and frees their shared memory block
+    """
+    if 'shared_memory' not in results:
+        return results
+
+    arrays = receive_arrays(results.pop('shared_memory'))
+    if 'banding_points_indices' in arrays:
+        results['banding_points'] = csr_to_banding_points(arrays.pop('banding_points_indices'), arrays.pop('banding_points_offsets'))
+    results.update(arrays)
+
+    return results
+
+def _extract(img):
+    """ Extracts a single banding pattern in a worker process
+
+    Arguments:
+        img: an image, an image path or a shared memory descriptor of an image.
+
+    Returns:
+        The results of get_banding_pattern(), see _share_results() if shared memory is used.
+    """
+    if isinstance(img, dict):
+        shm, arrays = attach_arrays(img)
+        results = extract_with_time_budget(arrays['img'], _worker_timeout, **_worker_params)
+        del arrays
+        try:
+            shm.close()
+        except BufferError: # views are still referenced, released with the process
+            pass
+    else:
+        results = extract_with_time_budget(_load_image(img), _worker_timeout, **_worker_params)
+
+    if _worker_shared_memory:
+        results = _share_results(results)
+
+    return results
+
+def _share_images(tasks, blocks):
+    """ Lazily copies each image of a task into its own shared memory block
+
+    Arguments:
+        tasks: iterable of tuples of key and image (or path, which is passed on as is).
+        blocks: dictionary, the SharedMemory object of each key is stored in it.
+
+    Returns:
+        Generator of tuples of key and shared memory descriptor.
+    """
+    for key, img in tasks:
+        if isinstance(img, np.ndarray):
+            blocks[key], img = share_arrays({'img': img})
+        yield key, img
+
+def read_image(file_path, extraction_size=None):
+    """ Reads a grayscale chromosome image and optionally resizes it
+
+    Arguments:
+        file_path: path of the image.
+        extraction_size: optional, size to which the (square) image is resized.
+
+    Returns:
+        The image, None if it could not be read.
+    """
+    img = cv.imread(file_path, 0)
+    if img is not None and extraction_size is not None:
+        img = cv.resize(img, (extraction_size, extraction_size))
+
+    return img
+
+def prefetch_images(file_paths, extraction_size=None, prefetch=16, threads=2):
+    """ Decodes images ahead of time in a small thread pool
+
+    Arguments:
+        file_paths: iterable of image paths.
+        extraction_size: optional, see read_image()
+        prefetch: optional, maximum number of images that are decoded ahead.
+        threads: optional, number of decoding threads.
+
+    Returns:
+        Generator of the images, in order of the paths.
+    """
+    with ThreadPoolExecutor(threads) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(executor.submit(read_image, file_path, extraction_size))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+def _enumerate_images(imgs):
+    """ Lazily enumerates a batch of images
+
+    Arguments:
+        imgs: 3D numpy array or any iterable of images or image paths.
+
+    Returns:
+        Generator of tuples of index and image (or path).
+    """
+    if hasattr(imgs, 'shape'):
+        return ((i, imgs[i]) for i in range(imgs.shape[0]))
+
+    return enumerate(imgs)
+
+def _extract_chunk(chunk):
+    """ Extracts the banding patterns of a chunk of images in a worker process
+
+    Arguments:
+        chunk: list of tuples of key and image (or image path).
+
+    Returns:
+        List of tuples of key and result.
+    """
+    return [(key, _extract(img)) for key, img in chunk]
+
+def _extract_chunk_in_thread(params, chunk):
+    """ Extracts the banding patterns of a chunk of images in a pool thread, reusing its scratch buffers
+
+    Arguments:
+        params: dictionary of extraction parameters, see get_banding_pattern()
+        chunk: list of tuples of key and image (or image path).
+
+    Returns:
+        List of tuples of key and result.
+    """
+    if not hasattr(_thread_local, 'scratch'):
+        _thread_local.scratch = ScratchBuffers()
+
+    return [(key, get_banding_pattern(_load_image(img), scratch=_thread_local.scratch, **params)) for key, img in chunk]
+
+def _chunked(tasks, chunk_size):
+    """ Lazily groups an iterable of tasks into lists of chunk_size tasks
+    """
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def imap_bounded(pool, func, tasks, chunk_size, max_in_flight, ordered=False, timeout=None, on_timeout=None, restart_pool=None):
+    """ Submits chunks of tasks to a pool and yields the results as soon as a chunk is finished
+
+    The tasks are consumed lazily and at most max_in_flight chunks are submitted at any time, so
+    memory does not grow with the number of tasks.
+
+    Arguments:
+        pool: a multiprocessing Pool.
+        func: function that receives a chunk (list of tasks) and returns a list of results.
+        tasks: iterable of tasks.
+        chunk_size: number of tasks per chunk.
+        max_in_flight: maximum number of submitted chunks that have not been yielded yet. In ordered
+            mode, finished chunks that wait for an earlier chunk count towards this bound.
+        ordered: optional, yield the results in the order of the tasks.
+        timeout: optional, seconds per task after which a chunk is given up. The deadline starts
+            at submission, so max_in_flight should not exceed the number of workers.
+        on_timeout: function that receives a chunk that was given up and returns its list of results.
+            Required with timeout.
+        restart_pool: function that terminates the pool and returns a new one. Required with timeout,
+            as the stuck worker can only be stopped by terminating its pool. The other unfinished
+            chunks are submitted again to the new pool.
+
+    Returns:
+        Generator of results.
+    """
+    finished = queue.Queue()
+    chunks = _chunked(tasks, chunk_size)
+    buffered = {}
+    running = {} # index: (chunk, deadline) of submitted, unfinished chunks
+    next_index = 0
+    submitted = 0
+    in_flight = 0
+    generation = 0
+    exhausted = False
+
+    def submit(index, chunk):
+        deadline = None if timeout is None else time.monotonic() + timeout * len(chunk)
+        running[index] = (chunk, deadline)
+        pool.apply_async(func, (chunk,),
+            callback=lambda outcome, g=generation: finished.put((g, index, outcome)),
+            error_callback=lambda error, g=generation: finished.put((g, index, error)))
+
+    while True:
+        # Keep the pool busy, but never exceed the bound
+        while not exhausted and in_flight < max_in_flight:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                exhausted = True
+                break
+            submit(submitted, chunk)
+            submitted += 1
+            in_flight += 1
+
+        if in_flight == 0:
+            break
+
+        if timeout is None:
+            outcome_generation, index, outcome = finished.get()
+        else:
+            expired = min(running, key=lambda index: running[index][1])
+            try:
+                outcome_generation, index, outcome = finished.get(timeout=max(running[expired][1] - time.monotonic(), 0))
+            except queue.Empty:
+                # Give the chunk up and recycle the workers, results of the old pool are ignored
+                expired_chunk, _ = running.pop(expired)
+                pool = restart_pool()
+                generation += 1
+                for index, (chunk, _) in list(running.items()):
+                    submit(index, chunk)
+                outcome_generation, index, outcome = generation, expired, on_timeout(expired_chunk)
+
+        if outcome_generation != generation:
+            continue
+        if isinstance(outcome, BaseException):
+            raise outcome
+        running.pop(index, None)
+        buffered[index] = outcome
+
+        if ordered:
+            ready = []
+            while next_index in buffered:
+                ready.append(buffered.pop(next_index))
+                next_index += 1
+        else:
+            ready = [buffered.pop(index)]
+
+        for outcome in ready:
+            in_flight -= 1
+            for result in outcome:
+                yield result
+
+def iter_banding_patterns(source, workers=None, max_in_flight=None, ordered=False, chunk_size=1, shared_memory=False, backend='process', timeout=None, **params):
+    """ Extracts banding patterns with multiple processes and yields each result as soon as it is finished
+
+    The source is consumed lazily and at most max_in_flight chunks are submitted or waiting to be
+    yielded, so memory stays bounded and downstream consumers can overlap with the extraction.
+
+    Arguments:
+        source: numpy 3D array, where the first dimension corresponds to the sample, any iterable of
+            images (of different shapes) or image paths, or a dictionary of key and image (or path).
+        workers: optional, number of processes, defaults to the number of cpus.
+        max_in_flight: optional, maximum number of chunks in flight, defaults to twice the number of workers.
+        ordered: optional, yield the results in the order of the source, otherwise in order of completion.
+        chunk_size: optional, number of images that are sent to a worker at once.
+        shared_memory: optional, exchange images and array results via shared memory, see
+            get_banding_pattern_multi_process()
+        backend: optional, 'process' or 'thread'. Threads avoid process start up and pickling costs,
+            which dominate for small images, and reuse preallocated scratch buffers per thread.
+            See backend_benchmark.py for the image size at which processes become faster.
+        timeout: optional, time budget per image in seconds, process backend only. An image that
+            exceeds it yields a timeout error result, with the stage that was running in 'stage', and
+            the batch continues. Workers that do not give up in time (e.g. in compiled code) are
+            terminated and replaced, the other images of their chunk are reported as timeouts too.
+            With a budget, at most workers chunks are in flight.
+        params**: see get_banding_pattern(), pickle_conform_results is set unless shared memory is used.
+
+    Returns:
+        Generator of tuples of key and result. The key is the index of the image in the source, or its
+        key if the source is a dictionary.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    if backend not in ['process', 'thread']:
+        raise ValueError("Unknown backend '{0}', choose 'process' or 'thread'.".format(backend))
+
+    if shared_memory and backend == 'thread':
+        raise ValueError("Shared memory is only used by the process backend.")
+
+    if timeout is not None and backend == 'thread':
+        raise ValueError("Time budgets are only supported by the process backend, threads can not be stopped.")
+
+    if timeout is not None:
+        # Chunks have to start right away, as their deadline starts at submission
+        max_in_flight = min(max_in_flight, workers)
+
+    params.setdefault("pickle_conform_results", not shared_memory) # some of the variables are not serialiasable
+
+    if isinstance(source, dict):
+        tasks = iter(source.items())
+    else:
+        tasks = _enumerate_images(source)
+
+    # Shared memory blocks of the input images, a single one for stacks
+    stack_shm = None
+    blocks = {}
+    if shared_memory:
+        # Workers have to report their blocks to the resource tracker of this process
+        resource_tracker.ensure_running()
+        if isinstance(source, np.ndarray):
+            stack_shm, descriptors = share_stack(source)
+            tasks = enumerate(descriptors)
+        else:
+            tasks = _share_images(tasks, blocks)
+
+    if backend == 'thread':
+        pools = [ThreadPool(workers)]
+        func = partial(_extract_chunk_in_thread, params)
+    else:
+        pools = [Pool(workers, initializer=_init_worker, initargs=(params, shared_memory, timeout))]
+        func = _extract_chunk
+
+    def restart_pool():
+        pools[0].terminate()
+        pools[0] = Pool(workers, initializer=_init_worker, initargs=(params, shared_memory, timeout))
+        return pools[0]
+
+    def on_timeout(chunk):
+        return [(key, timeout_result(timeout)) for key, _ in chunk]
+
+    hard_timeout = None if timeout is None else timeout + HARD_TIMEOUT_GRACE
+
+    try:
+        results = imap_bounded(pools[0], func, tasks, chunk_size, max_in_flight, ordered, hard_timeout, on_timeout, restart_pool)
+        for key, result in results:
+            result = _receive_results(result)
+            if key in blocks:
+                blocks[key].close()
+                blocks.pop(key).unlink()
+            yield key, result
+    finally:
+        pools[0].terminate()
+        for shm in [stack_shm] + list(blocks.values()):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+def get_banding_pattern_multi_process(imgs, workers, pixel_sampling=5, pixel_sigma=2, density_sigma=2, step_vector=1, chromsome_threshold=None, size=None, reject_multiple_blobs=False, chunk_size=1, max_in_flight=None, shared_memory=False, backend='process', timeout=None):
+    """ Extracts multiple banding patterns with multiple processes
+
+    The parameters are passed once to each worker process, images are submitted in chunks and the
+    results are collected as soon as they are finished. Images are consumed lazily, so memory scales
+    with the number of chunks in flight and not with the size of the batch. See iter_banding_patterns()
+    to consume the results while the batch is still running.
+
+    Arguments:
+        imgs: numpy 3D array, where the first dimension corresponds to the sample, or any iterable
+            (e.g. a list or generator) of images of different shapes or of image paths. Paths are
+            loaded inside the worker processes.
+        workers: number of processes
+        chunk_size: optional, number of images that are sent to a worker at once.
+        max_in_flight: optional, maximum number of chunks that are submitted at the same time,
+            defaults to twice the number of workers.
+        shared_memory: optional, if set, input images and the array parts of the results (profiles,
+            coordinates, skeleton, blobs and banding points) are exchanged via shared memory blocks
+            instead of being pickled. The full diagnostic results are returned then, apart from
+            'paths' and 'longest_path'.
+        backend: optional, 'process' or 'thread', see iter_banding_patterns()
+        timeout: optional, time budget per image in seconds, see iter_banding_patterns()
+        args**: get_banding_pattern()
+
+    Returns:
+        List of results, where each entry contains intermediate values and the final binarized banding pattern.
+        See get_banding_pattern()
+    """
+    results = iter_banding_patterns(
+        imgs, workers, max_in_flight, ordered=False, chunk_size=chunk_size, shared_memory=shared_memory, backend=backend, timeout=timeout,
+        pixel_sampling=pixel_sampling,
+        pixel_sigma=pixel_sigma,
+        density_sigma=density_sigma,
+        step_vector=step_vector,
+        chromsome_threshold=chromsome_threshold,
+        size=size,
+        reject_multiple_blobs=reject_multiple_blobs)
+
+    output_results = {}
+    for num, result in results:
+        output_results[num] = result
+
+    return [output_results[num] for num in range(len(output_results))]
@@ -0,0 +1,168 @@
+import json
+import numpy as np
+import cv2 as cv
+from scipy.sparse import csr_matrix
+
+from .banding_pattern_extraction import get_banding_pattern
+from .lib.pattern_rendering import line_pixels, map_to_lines, nearest_painted
+
+class ChromosomeGeometry:
+    """ Shape of an extracted chromosome, which renders any banding pattern onto it without a new extraction
+
+    Holds the blob mask, the sampled centreline, the pixels of each perpendicular line and the nearest
+    painted pixel of every blob pixel that no line hit. Build it once with from_image() and render as
+    many patterns as needed. Dark bands (1) are rendered black, white bands (0) gray and the background
+    white, pixels hit by multiple lines get the rounded mean.
+
+    Arguments:
+        blob: binary mask of the chromosome.
+        pixels: flat image index of every line pixel, see line_pixels()
+        line_ids: banding pattern entry of every line pixel, see line_pixels()
+        n_lines: number of lines.
+        fill_targets: flat indices of the blob pixels that no line hit, see nearest_painted()
+        fill_sources: flat indices of their nearest painted pixels.
+        banding_pattern: optional, the extracted binarized banding pattern.
+        r_sampled: optional, row indices of the sampled centreline.
+        c_sampled: optional, column indices of the sampled centreline.
+        original_shape: optional, shape to which the rendered images are resized, if the chromosome was
+            extracted at another size.
+        dtype: optional, dtype of the rendered images.
+    """
+
+    # Arrays that are saved, apart from the metadata
+    array_names = ['blob', 'pixels', 'line_ids', 'fill_targets', 'fill_sources', 'banding_pattern', 'r_sampled', 'c_sampled']
+
+    def __init__(self, blob, pixels, line_ids, n_lines, fill_targets, fill_sources, banding_pattern=None, r_sampled=None, c_sampled=None, original_shape=None, dtype=np.uint8):
+        self.blob = np.asarray(blob, dtype=bool)
+        self.pixels = np.asarray(pixels, dtype=np.int64)
+        self.line_ids = np.asarray(line_ids, dtype=np.int64)
+        self.n_lines = int(n_lines)
+        self.fill_targets = np.asarray(fill_targets, dtype=np.int64)
+        self.fill_sources = np.asarray(fill_sources, dtype=np.int64)
+        self.banding_pattern = None if banding_pattern is None else np.asarray(banding_pattern)
+        self.r_sampled = None if r_sampled is None else np.asarray(r_sampled)
+        self.c_sampled = None if c_sampled is None else np.asarray(c_sampled)
+        self.original_shape = None if original_shape is None else tuple(original_shape)
+        self.dtype = np.dtype(dtype)
+        self.shape = self.blob.shape
+
+        # Sum of the line values of each painted pixel as a single sparse product
+        self.painted_pixels, inverse = np.unique(self.pixels, return_inverse=True)
+        self.line_sums = csr_matrix((np.ones(len(self.pixels)), (inverse.ravel(), self.line_ids)), shape=(len(self.painted_pixels), self.n_lines))
+        self.line_counts = np.asarray(self.line_sums.sum(axis=1)).ravel()
+
+    @classmethod
+    def from_results(cls, results, original_shape=None, dtype=np.uint8):
+        """ Creates the geometry from the results of get_banding_pattern()
+
+        Arguments:
+            results: the full (not pickle conform) results of a successful extraction.
+            original_shape: optional, see ChromosomeGeometry.
+            dtype: optional, dtype of the rendered images.
+        """
+        if results['error']:
+            raise ValueError(results['error_message'])
+
+        blob = results['blobs'].astype(bool)
+        r = results['r']
+        pixels, line_ids, n_lines = line_pixels(results['banding_points'], blob.shape, flipped=r[0] > r[-1])
+
+        painted = np.zeros(blob.size, dtype=bool)
+        painted[pixels] = True
+        fill_targets, fill_sources = nearest_painted(painted.reshape(blob.shape), blob)
+
+        return cls(blob, pixels, line_ids, n_lines, fill_targets, fill_sources,
+            banding_pattern=results['binarized_banding_pattern'],
+            r_sampled=results['r_sampled'],
+            c_sampled=results['c_sampled'],
+            original_shape=original_shape,
+            dtype=dtype)
+
+    @classmethod
+    def from_image(cls, img, extraction_size=None, **args):
+        """ Extracts the geometry of a chromosome image
+
+        Arguments:
+            img: the chromosome image.
+            extraction_size: optional, size at which the chromosome is extracted and rendered, the
+                rendered images are resized to the image size. Assumes a square image.
+            args**: see get_banding_pattern(), e.g. cache=ResultCache(...) to reuse earlier extractions.
+        """
+        original_shape = None
+        if extraction_size is not None:
+            original_shape = img.shape
+            img = cv.resize(img, (extraction_size, extraction_size))
+
+        return cls.from_results(get_banding_pattern(img, **args), original_shape, img.dtype)
+
+    def render(self, banding_pattern=None):
+        """ Renders a binarized banding pattern onto the chromosome
+
+        Arguments:
+            banding_pattern: optional, the pattern, by default the extracted one. Patterns of another
+                length than the number of lines are mapped to the lines by nearest neighbour.
+
+        Returns:
+            The banding pattern segmentation image.
+        """
+        if banding_pattern is None:
+            banding_pattern = self.banding_pattern
+
+        return self.render_batch(np.asarray(banding_pattern)[np.newaxis])[0]
+
+    def render_batch(self, banding_patterns, out=None):
+        """ Renders multiple binarized banding patterns of the same length at once
+
+        Arguments:
+            banding_patterns: 2D array, one pattern per row.
+            out: optional, preallocated output array of shape (batch size, height, width), where height
+                and width are those of the original shape, if set.
+
+        Returns:
+            Array of the segmentation images.
+        """
+        values = map_to_lines(1 - np.asarray(banding_patterns, dtype=float), self.n_lines)
+        means = (self.line_sums @ values.T).T / self.line_counts
+
+        shape = self.shape if self.original_shape is None else self.original_shape
+        if out is None:
+            out = np.empty((len(values),) + tuple(shape[:2]), dtype=self.dtype)
+
+        segmentation = np.full(self.blob.size, 255, dtype=self.dtype) # background should be white
+        for i in range(len(values)):
+            segmentation[self.painted_pixels] = np.round(means[i]) * 127.5 # white bands should be gray
+            segmentation[self.fill_targets] = segmentation[self.fill_sources]
+
+            if self.original_shape is None:
+                out[i] = segmentation.reshape(self.shape)
+            else:
+                out[i] = cv.resize(segmentation.reshape(self.shape), (shape[1], shape[0]))
+
+        return out
+
+    def save(self, path):
+        """ Saves the geometry as npz file
+
+        Arguments:
+            path: path of the file.
+        """
+        meta = {
+            'n_lines': self.n_lines,
+            'original_shape': self.original_shape,
+            'dtype': self.dtype.str,
+        }
+        arrays = {name: getattr(self, name) for name in self.array_names if getattr(self, name) is not None}
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """ Loads a geometry saved by save()
+
+        Arguments:
+            path: path of the file.
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in cls.array_names if name in data.files}
+
+        return cls(n_lines=meta['n_lines'], original_shape=meta['original_shape'], dtype=meta['dtype'], **arrays)
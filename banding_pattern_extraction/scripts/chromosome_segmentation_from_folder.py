@@ -0,0 +1,200 @@
+import os
+import csv
+import json
+from time import time
+from collections import deque
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2 as cv
+
+from .batch_extraction import read_image
+from .chromosome_segmentation import get_segmented_chromosome
+
+def _segment_file(args):
+    """ Pool helper, segments a single image file
+
+    Returns:
+        Tuple of the segmentation (None on failure) and the error message.
+    """
+    file_path, extraction_size, params = args
+    try:
+        img = read_image(file_path)
+        if img is None:
+            raise ValueError("Could not read image.")
+        return get_segmented_chromosome(img, extraction_size, **params), ''
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def _write_image(path, img):
+    """ Writes an image atomically, so an existing file is always complete
+    """
+    root, ext = os.path.splitext(path)
+    tmp_path = root + '.tmp' + ext # keeps the extension, which selects the image format
+    try:
+        if not cv.imwrite(tmp_path, img):
+            raise IOError("Could not write '{0}'.".format(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def stack_index_path(stack_path):
+    """ Returns the path of the index of a segmentation stack """
+    return os.path.splitext(stack_path)[0] + '_index.json'
+
+def load_segmentation_stack(stack_path, mmap_mode='r'):
+    """ Loads a segmentation stack written by folder_to_segmentations()
+
+    Arguments:
+        stack_path: path of the npy file.
+        mmap_mode: optional, see np.load(), None loads the stack into memory.
+
+    Returns:
+        Tuple of the stack (3D array, one segmentation per file) and the list of file names. The name of
+        a file that could not be segmented or stacked (another shape) is None, its row is white.
+    """
+    with open(stack_index_path(stack_path), 'r') as f:
+        names = json.load(f)['names']
+
+    return np.load(stack_path, mmap_mode=mmap_mode), names
+
+def folder_to_segmentations(source_path, destination_path, extraction_size=None, workers=1, writers=2, resume=False, stack_name=None, **params):
+    """ Creates the banding pattern segmentations of the chromosomes in a folder
+
+    With more than one worker, the files are decoded and segmented in a process pool. The images are
+    encoded and written by background threads, each file is written atomically. The files are processed
+    in sorted order. Files that could not be segmented or written (e.g. without an image file extension)
+    are logged with their error message in "segmentation_errors.csv".
+
+    Arguments:
+        source_path: path of the folder.
+        destination_path: folder of the segmentations, they are named after the source files.
+        extraction_size: optional, see get_segmented_chromosome()
+        workers: optional, number of segmentation processes.
+        writers: optional, number of writing threads.
+        resume: optional, skip files whose segmentation already exists. Previously failed files are retried.
+        stack_name: optional, name of a npy file in the destination, into which all segmentations are
+            stacked in file order, e.g. for a training loader that memory maps it. The file names of the
+            rows are saved in "<stack name>_index.json", see load_segmentation_stack(). Segmentations
+            of another shape than the first one are still written, but their row is left empty.
+        params**: see get_banding_pattern()
+
+    Returns:
+        Tuple of the number of segmented (including skipped) and failed files.
+    """
+    os.makedirs(destination_path, exist_ok=True)
+    file_list = sorted(os.listdir(source_path))
+    amount = len(file_list)
+
+    existing = set(os.listdir(destination_path)) if resume else set()
+    todo = [i for i, file_name in enumerate(file_list) if file_name not in existing]
+    if resume:
+        print("Resuming, skipping {0} finished files".format(amount - len(todo)))
+
+    # The segmentations are saved under the source file names, which needs a known image extension
+    unwritable = [i for i in todo if not cv.haveImageWriter(file_list[i])]
+    todo = [i for i in todo if cv.haveImageWriter(file_list[i])]
+
+    tasks = [(os.path.join(source_path, file_list[i]), extraction_size, params) for i in todo]
+    stack = None
+    names = [None] * amount
+    segmented = 0
+    failed = 0
+
+    def add_to_stack(i, segmentation):
+        nonlocal stack
+        if stack is None:
+            stack = np.lib.format.open_memmap(os.path.join(destination_path, stack_name), mode='w+', dtype=segmentation.dtype, shape=(amount,) + segmentation.shape)
+            stack[:] = 255 # failed files are white
+        if segmentation.shape != stack.shape[1:]:
+            print("Segmentation of '{0}' is not stacked, its shape {1} differs from the stack shape {2}.".format(file_list[i], segmentation.shape, stack.shape[1:]))
+            return
+        stack[i] = segmentation
+        names[i] = file_list[i]
+
+    try:
+        with open(os.path.join(destination_path, 'segmentation_errors.csv'), 'w') as error_f, ThreadPoolExecutor(writers) as executor:
+            error_writer = csv.writer(error_f)
+            error_writer.writerow(["file_name", "error_message"])
+
+            def log_error(file_name, error_message):
+                print("Segmentation of '{0}' failed, due to: {1}".format(file_name, error_message))
+                error_writer.writerow([file_name, error_message])
+                error_f.flush()
+
+            for i in unwritable:
+                log_error(file_list[i], "No image writer for the file extension, the segmentation can not be saved under this name.")
+                failed += 1
+
+            # Skipped files only have to be read, if they are stacked
+            skipped = sorted(set(range(amount)) - set(todo) - set(unwritable))
+            if stack_name is not None:
+                for i in skipped:
+                    segmentation = read_image(os.path.join(destination_path, file_list[i]))
+                    if segmentation is None:
+                        log_error(file_list[i], "Could not read the existing segmentation.")
+                        failed += 1
+                        continue
+                    add_to_stack(i, segmentation)
+                    segmented += 1
+            else:
+                segmented += len(skipped)
+
+            def finish_write():
+                """ Waits for the oldest write, a failed write only fails its file """
+                nonlocal segmented, failed
+                i, future = pending.popleft()
+                try:
+                    future.result()
+                    segmented += 1
+                except (cv.error, OSError) as e:
+                    log_error(file_list[i], "Could not write the segmentation: {0}".format(e))
+                    if names[i] is not None: # not in the stack either
+                        stack[i] = 255
+                        names[i] = None
+                    failed += 1
+
+            pool = Pool(workers) if workers > 1 else None
+            try:
+                if pool is not None:
+                    results = pool.imap(_segment_file, tasks, chunksize=1)
+                else:
+                    results = map(_segment_file, tasks)
+
+                t1 = time()
+                pending = deque()
+                for n, (i, (segmentation, error_message)) in enumerate(zip(todo, results)):
+                    file_name = file_list[i]
+
+                    if (n+1) % 100 == 0:
+                        print("Finished: {0}/{1} ({2:.1f} images/s)".format(n + 1, len(todo), (n + 1) / (time() - t1)))
+
+                    if segmentation is None:
+                        log_error(file_name, error_message)
+                        failed += 1
+                        continue
+
+                    if stack_name is not None:
+                        add_to_stack(i, segmentation)
+
+                    pending.append((i, executor.submit(_write_image, os.path.join(destination_path, file_name), segmentation)))
+
+                    # Bound the number of segmentations that wait for their writer
+                    while len(pending) > 4 * writers:
+                        finish_write()
+
+                while pending:
+                    finish_write()
+            finally:
+                if pool is not None:
+                    pool.terminate()
+    finally:
+        # The stack stays usable, even if the run was interrupted
+        if stack is not None:
+            stack.flush()
+            with open(stack_index_path(os.path.join(destination_path, stack_name)), 'w') as f:
+                json.dump({'names': names}, f)
+
+    return segmented, failed
@@ -0,0 +1,48 @@
+import json
+import base64
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+# Only the standard library is imported, so the client starts fast
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+def extract_remote(img_path, url=DEFAULT_URL, send_image=False, timeout=None, **params):
+    """ Requests an extraction from a running extraction daemon, see ExtractionServer
+
+    Arguments:
+        img_path: path of the chromosome image.
+        url: optional, url of the daemon.
+        send_image: optional, send the image file instead of its path, e.g. if the daemon runs in
+            another file system namespace.
+        timeout: optional, time budget of the extraction in seconds.
+        params**: extraction parameters, see get_banding_pattern()
+
+    Returns:
+        The results dictionary with 'binarized_banding_pattern', 'num_blobs', 'error' and 'error_message'.
+    """
+    request = {'params': params, 'timeout': timeout}
+    if send_image:
+        with open(img_path, 'rb') as f:
+            request['image'] = base64.b64encode(f.read()).decode('ascii')
+    else:
+        request['path'] = img_path
+
+    return _post(url + '/extract', json.dumps(request).encode('utf-8'), 'application/json')
+
+def extract_remote_bytes(img_bytes, url=DEFAULT_URL, timeout=None, **params):
+    """ Requests the extraction of an encoded image (e.g. the bytes of a png file), see extract_remote()
+    """
+    if timeout is not None:
+        params['timeout'] = timeout
+    query = urlencode({key: json.dumps(value) for key, value in params.items()})
+
+    return _post(url + '/extract?' + query, img_bytes, 'application/octet-stream')
+
+def _post(url, body, content_type):
+    request = Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urlopen(request) as response:
+            return json.loads(response.read())
+    except HTTPError as e:
+        return json.loads(e.read())
@@ -0,0 +1,202 @@
+import io
+import os
+import json
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import cv2 as cv
+
+from .batch_extraction import read_image, extract_with_time_budget
+from .pipeline import DEFAULT_PARAMETERS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Results that are returned to clients
+RESPONSE_KEYS = ['binarized_banding_pattern', 'num_blobs', 'error', 'error_message', 'stage']
+
+def _warm_up(_):
+    """ Runs a tiny extraction, so the worker has imported and initialised everything before the first request
+    """
+    img = np.full((16, 16), 255, dtype=np.uint8)
+    img[4:12, 6:10] = 0
+    extract_with_time_budget(img)
+
+def _extract_request(source, params, timeout=None):
+    """ Extracts the banding pattern of a request in a worker process
+
+    Arguments:
+        source: image path or encoded image bytes (e.g. a png file).
+        params: dictionary of extraction parameters, see get_banding_pattern()
+        timeout: optional, time budget in seconds.
+
+    Returns:
+        Dictionary of the RESPONSE_KEYS.
+    """
+    if isinstance(source, bytes):
+        img = cv.imdecode(np.frombuffer(source, dtype=np.uint8), cv.IMREAD_GRAYSCALE)
+    else:
+        img = read_image(source)
+
+    results = extract_with_time_budget(img, timeout, pickle_conform_results=True, **params)
+    results = {key: results[key] for key in RESPONSE_KEYS if key in results}
+    if 'binarized_banding_pattern' in results:
+        results['binarized_banding_pattern'] = [int(x) for x in results['binarized_banding_pattern']]
+
+    return results
+
+def _parse_value(value):
+    """ Parses a query string value as json, e.g. "5" or "null", and keeps other values as string
+    """
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+class ExtractionServer(ThreadingHTTPServer):
+    """ Long-running extraction daemon with a warm process pool, serving localhost HTTP requests
+
+    Each worker is warmed up at start, so requests only pay for the extraction itself. Requests:
+
+        GET /health
+            Returns {"status": "ok", "workers": n}
+
+        POST /extract
+            Either a json body {"path": ..., "params": {...}, "timeout": ...}, where "image" (base64
+            encoded image file) can be sent instead of a path, or the raw image file as body with
+            the parameters in the query string, e.g. /extract?pixel_sampling=5&timeout=10.
+
+    Results are returned as json (see RESPONSE_KEYS). With the header "Accept: application/x-npy" the
+    binarized banding pattern is returned as npy file instead, errors are always returned as json.
+
+    Arguments:
+        host: optional, host to bind to, only bind to other hosts than localhost in trusted networks.
+        port: optional, port to bind to, 0 chooses a free port.
+        workers: optional, number of extraction processes, defaults to the number of cpus.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+        super().__init__((host, port), ExtractionRequestHandler)
+        self.workers = workers if workers is not None else os.cpu_count()
+        self._lock = threading.Lock()
+        self.executor = None
+        self.start_pool()
+
+    def start_pool(self):
+        """ (Re)starts and warms up the process pool
+        """
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.executor = ProcessPoolExecutor(self.workers)
+            list(self.executor.map(_warm_up, range(self.workers)))
+
+    def extract(self, source, params, timeout=None):
+        """ Runs an extraction in the pool, restarts the pool if a worker died
+
+        Returns:
+            Dictionary of the RESPONSE_KEYS.
+        """
+        try:
+            return self.executor.submit(_extract_request, source, params, timeout).result()
+        except BrokenProcessPool:
+            self.start_pool()
+            raise
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+    """ Request handler of ExtractionServer
+    """
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send_json(200, {'status': 'ok', 'workers': self.server.workers})
+        else:
+            self._send_json(404, {'error': True, 'error_message': 'Unknown path'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/extract':
+            self._send_json(404, {'error': True, 'error_message': 'Unknown path'})
+            return
+
+        try:
+            source, params, timeout = self._parse_request(url)
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'error': True, 'error_message': 'Invalid request: {0}'.format(e)})
+            return
+
+        unknown = set(params) - set(DEFAULT_PARAMETERS)
+        if unknown:
+            self._send_json(400, {'error': True, 'error_message': 'Unknown extraction parameters: {0}'.format(sorted(unknown))})
+            return
+
+        try:
+            results = self.server.extract(source, params, timeout)
+        except Exception as e:
+            self._send_json(500, {'error': True, 'error_message': str(e) or type(e).__name__})
+            return
+
+        if results['error'] or self.headers.get('Accept') != 'application/x-npy':
+            self._send_json(200, results)
+        else:
+            buffer = io.BytesIO()
+            np.save(buffer, np.asarray(results['binarized_banding_pattern'], dtype=np.int8))
+            self._send(200, 'application/x-npy', buffer.getvalue())
+
+    def _parse_request(self, url):
+        """ Returns a tuple of the image source (path or bytes), the parameters and the timeout
+        """
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        content_type = self.headers.get('Content-Type', '')
+
+        if content_type.startswith('application/json'):
+            request = json.loads(body)
+            params = request.get('params', {})
+            timeout = request.get('timeout')
+            if 'image' in request:
+                source = base64.b64decode(request['image'])
+            else:
+                source = request['path']
+        else:
+            params = {key: _parse_value(value) for key, value in parse_qsl(url.query)}
+            timeout = params.pop('timeout', None)
+            source = body
+            if not source:
+                raise ValueError("no image in the request body")
+
+        if not isinstance(params, dict):
+            raise ValueError("params have to be an object")
+
+        return source, params, timeout
+
+    def _send_json(self, status, data):
+        self._send(status, 'application/json', json.dumps(data).encode('utf-8'))
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    """ Runs the extraction daemon until it is interrupted, see ExtractionServer
+    """
+    server = ExtractionServer(host, port, workers)
+    print("Serving extractions on http://{0}:{1} with {2} workers".format(host, server.server_address[1], server.workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import subprocess
+from time import time, strftime
+
+# Statement whose imports are measured, the core extraction path
+DEFAULT_STATEMENT = 'from banding_pattern_extraction import get_banding_pattern; get_banding_pattern'
+
+# Modules that should never be imported by the extraction path
+UNWANTED_MODULES = ['matplotlib', 'mpl_toolkits', 'noise']
+
+# Folder from which the package can be imported
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_import_times(stderr):
+    """ Parses the output of "python -X importtime"
+
+    Arguments:
+        stderr: the standard error output.
+
+    Returns:
+        Dictionary of module name and a tuple of its self and cumulative import time in microseconds.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
+
+def measure_import_time(statement=DEFAULT_STATEMENT, repeats=5, top=10):
+    """ Measures the import time of a statement in fresh interpreters
+
+    Arguments:
+        statement: optional, python statement, e.g. an import.
+        repeats: optional, number of interpreter runs, the median is reported.
+        top: optional, number of slowest modules that are reported.
+
+    Returns:
+        Dictionary with the median total import time in ms, the slowest modules (by self time, of the
+        median run) and the unwanted modules that were imported.
+    """
+    runs = []
+    for _ in range(repeats):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=PACKAGE_PARENT,
+            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, universal_newlines=True, check=True)
+        times = parse_import_times(process.stderr)
+        runs.append((sum(self_us for self_us, _ in times.values()), times))
+
+    runs.sort(key=lambda run: run[0])
+    total_us, times = runs[len(runs) // 2]
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:top]
+
+    return {
+        'total_ms': total_us / 1000,
+        'modules': len(times),
+        'slowest': [[name, self_us / 1000] for name, (self_us, _) in slowest],
+        'unwanted': sorted(name for name in times if name.split('.')[0] in UNWANTED_MODULES and '.' not in name),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PACKAGE_PARENT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def record_import_time(history_path, statement=DEFAULT_STATEMENT, repeats=5, top=10):
+    """ Measures the import time and appends it to a history file, one json record per line
+
+    Arguments:
+        history_path: path of the history file.
+        statement, repeats, top: see measure_import_time()
+
+    Returns:
+        A tuple of the new record and the previous record of the same statement (None if there is none).
+    """
+    previous = None
+    if os.path.exists(history_path):
+        with open(history_path, 'r') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['statement'] == statement:
+                    previous = record
+
+    record = {
+        'date': strftime('%Y-%m-%d %H:%M:%S'),
+        'time': time(),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'statement': statement,
+    }
+    record.update(measure_import_time(statement, repeats, top))
+
+    with open(history_path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    return record, previous
@@ -23,6 +23,88 @@ def in_bounds(img, r, c):
     """
     return r < img.shape[0] and r >= 0 and c < img.shape[1] and c >=0
 
+def blob_bounding_box(blobs, margin=0):
+    """ Retrieves the bounding box of all foreground pixels, extended by a margin
+
+    Arguments:
+        blobs: the segmentation of the chromosome image.
+        margin: optional, number of pixels added on each side, clipped to the image.
+
+    Returns:
+        Tuple of the first row, last row (exclusive), first column and last column (exclusive).
+    """
+    rows = np.any(blobs, axis=1)
+    cols = np.any(blobs, axis=0)
+    if not np.any(rows):
+        raise ValueError("No chromosome detected, segmentation is empty.")
+
+    r_min, r_max = np.where(rows)[0][[0, -1]]
+    c_min, c_max = np.where(cols)[0][[0, -1]]
+
+    r_min = max(r_min - margin, 0)
+    c_min = max(c_min - margin, 0)
+    r_max = min(r_max + margin + 1, blobs.shape[0])
+    c_max = min(c_max + margin + 1, blobs.shape[1])
+
+    return int(r_min), int(r_max), int(c_min), int(c_max)
+
+def shift_banding_points(banding_points, r_offset, c_offset):
+    """ Shifts the indices of sampled perpendicular lines by a constant offset
+
+    Arguments:
+        banding_points: list of lists of image indices, as returned by sample().
+        r_offset: row offset.
+        c_offset: column offset.
+
+    Returns:
+        The shifted banding points. The first (placeholder) entry is kept as is.
+    """
+    shifted = [banding_points[0]]
+    for line in banding_points[1:]:
+        shifted.append([[r + r_offset, c + c_offset] for r, c in line])
+
+    return shifted
+
+def banding_points_to_csr(banding_points):
+    """ Packs the ragged banding points into two flat arrays
+
+    Arguments:
+        banding_points: list of lists of image indices, as returned by sample().
+
+    Returns:
+        Tuple of two arrays:
+            1. (N, 2) array of all image indices of all lines
+            2. offsets, line i consists of indices[offsets[i]:offsets[i+1]]
+        The first (placeholder) entry of the banding points is not stored.
+    """
+    lines = banding_points[1:]
+    lengths = [len(line) for line in lines]
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+
+    indices = np.zeros((offsets[-1], 2), dtype=np.int64)
+    for i, line in enumerate(lines):
+        if len(line) > 0:
+            indices[offsets[i]:offsets[i+1]] = line
+
+    return indices, offsets
+
+def csr_to_banding_points(indices, offsets):
+    """ Unpacks the flat representation of banding_points_to_csr()
+
+    Arguments:
+        indices: (N, 2) array of image indices.
+        offsets: line offsets.
+
+    Returns:
+        The banding points as list of lists, including the placeholder entry.
+    """
+    banding_points = [[0, 0]]
+    for i in range(len(offsets) - 1):
+        banding_points.append(indices[offsets[i]:offsets[i+1]].tolist())
+
+    return banding_points
+
 def sample(r_points, c_points, blobs, img, res=1, max_length=50):
     """ Samples the grayscale values for each perpendicular line all given point in a chromosome.
 
@@ -238,6 +320,21 @@ def resize_banding_pattern(banding_pattern, new_length):
 
     return resized_banding_pattern
 
+def banding_pattern_agreement(banding_pattern, reference):
+    """ Fraction of positions at which a banding pattern agrees with a reference pattern
+
+    Arguments:
+        banding_pattern: binarized banding pattern, resized to the length of the reference.
+        reference: binarized reference banding pattern.
+
+    Returns:
+        Agreement between 0 and 1.
+    """
+    if len(banding_pattern) != len(reference):
+        banding_pattern = resize_banding_pattern(banding_pattern, len(reference))
+
+    return float(np.mean(np.asarray(banding_pattern) == np.asarray(reference)))
+
 def cluster_1D(arr):
     """ Clusters a 1D binary vector
 
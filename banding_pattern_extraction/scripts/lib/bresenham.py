@@ -43,6 +43,8 @@ def bresenham_pixel_summation(p1, p2, blobs, img):
         x_temp = x0 + x*xx + y*yx
         y_temp = y0 + x*xy + y*yy
 
+        if x_temp < 0 or y_temp < 0: # out of bounds, negative indices would wrap around
+            break
         try:
             if not blobs[x_temp, y_temp]:
                 break
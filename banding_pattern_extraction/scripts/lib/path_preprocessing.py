@@ -56,10 +56,13 @@ def _interpolate(r_vec, c_vec, blobs, end=True):
         
         current_r = int(np.round(r2 + step_r * count))
         current_c = int(np.round(c2 + step_c * count))
-        try:
-            skeleton_not_reached = blobs[current_r, current_c]
-        except Exception: # out of bounds
+        if current_r < 0 or current_c < 0: # negative indices would wrap around to the opposite side
             skeleton_not_reached = False
+        else:
+            try:
+                skeleton_not_reached = blobs[current_r, current_c]
+            except Exception: # out of bounds
+                skeleton_not_reached = False
 
         new_r.append(current_r)
         new_c.append(current_c)
@@ -133,4 +136,39 @@ def subsample(r, c, sampling):
         r = np.array([r[0], r[-1]])
         c = np.array([c[0], c[-1]])
 
-    return r, c
\ No newline at end of file
+    return r, c
+
+def downsample_blobs(blobs, factor):
+    """ Downsamples a binary segmentation by majority vote in factor x factor blocks.
+
+    Arguments:
+        blobs: chromosome binary segmentation.
+        factor: integer downsampling factor.
+
+    Returns:
+        The downsampled segmentation.
+    """
+    rows = int(np.ceil(blobs.shape[0] / factor)) * factor
+    cols = int(np.ceil(blobs.shape[1] / factor)) * factor
+    padded = np.zeros((rows, cols))
+    padded[:blobs.shape[0], :blobs.shape[1]] = blobs
+
+    blocks = padded.reshape(rows // factor, factor, cols // factor, factor)
+
+    return blocks.mean(axis=(1, 3)) >= 0.5
+
+def upscale_indices(r, c, factor):
+    """ Maps row and column indices of a downsampled image to the centres of the original pixel blocks.
+
+    Arguments:
+        r: row indices.
+        c: column indices.
+        factor: the downsampling factor.
+
+    Returns:
+        Upscaled (float) r and c
+    """
+    r = (np.asarray(r) + 0.5) * factor - 0.5
+    c = (np.asarray(c) + 0.5) * factor - 0.5
+
+    return r, c
@@ -0,0 +1,77 @@
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+from .banding_pattern_utils import banding_points_to_csr, blob_bounding_box
+
+def line_pixels(banding_points, shape, flipped=False):
+    """ Flattens the perpendicular lines of an extraction, so a banding pattern can be painted in one pass
+
+    Arguments:
+        banding_points: banding points of get_banding_pattern(), including the placeholder entry.
+        shape: shape of the image.
+        flipped: optional, whether the extraction flipped the banding pattern, i.e. r[0] > r[-1].
+
+    Returns:
+        Tuple of three objects:
+            1. flat image index of every line pixel
+            2. index of the banding pattern entry that each pixel belongs to
+            3. number of lines
+    """
+    indices, offsets = banding_points_to_csr(banding_points)
+    n_lines = len(offsets) - 1
+
+    line_ids = np.repeat(np.arange(n_lines), np.diff(offsets))
+    if flipped: # the lines are stored in sampling order, the pattern was reversed
+        line_ids = n_lines - 1 - line_ids
+
+    pixels = np.ravel_multi_index((indices[:, 0], indices[:, 1]), shape)
+
+    return pixels, line_ids, n_lines
+
+def map_to_lines(values, n_lines):
+    """ Maps per-line values of another length (e.g. a resized or an imposed pattern) to the lines by nearest neighbour
+
+    Arguments:
+        values: array, the last dimension corresponds to the lines.
+        n_lines: number of lines.
+
+    Returns:
+        Array with n_lines entries in the last dimension.
+    """
+    length = values.shape[-1]
+    if length == n_lines:
+        return values
+    if length == 0:
+        raise ValueError("Empty banding pattern.")
+
+    return values[..., np.arange(n_lines) * length // n_lines]
+
+def nearest_painted(painted, blob):
+    """ Finds the nearest painted pixel of every blob pixel that was not painted by any line
+
+    A single Euclidean distance transform over the bounding box of the blob yields the nearest painted
+    pixel of every pixel.
+
+    Arguments:
+        painted: binary mask of the painted pixels.
+        blob: binary mask of the chromosome.
+
+    Returns:
+        Tuple of the flat indices of the unpainted blob pixels and of their nearest painted pixels.
+    """
+    blob = blob.astype(bool)
+    unpainted = blob & ~painted
+    if not np.any(painted) or not np.any(unpainted):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    r_min, r_max, c_min, c_max = blob_bounding_box(blob | painted)
+    _, (rows, cols) = distance_transform_edt(~painted[r_min:r_max, c_min:c_max], return_indices=True)
+
+    unpainted_rows, unpainted_cols = np.nonzero(unpainted)
+    source_rows = rows[unpainted_rows - r_min, unpainted_cols - c_min] + r_min
+    source_cols = cols[unpainted_rows - r_min, unpainted_cols - c_min] + c_min
+
+    targets = np.ravel_multi_index((unpainted_rows, unpainted_cols), painted.shape)
+    sources = np.ravel_multi_index((source_rows, source_cols), painted.shape)
+
+    return targets, sources
@@ -0,0 +1,220 @@
+import os
+import csv
+import json
+import struct
+import numpy as np
+
+# File layout:
+#   MAGIC, padded to DATA_OFFSET bytes
+#   pattern values, all patterns concatenated
+#   offsets, int64, len + 1 entries, pattern i is values[offsets[i]:offsets[i+1]]
+#   index, utf-8 json with the dtype and the names
+#   footer, see FOOTER
+MAGIC = b'BPSTORE1'
+DATA_OFFSET = 64
+FOOTER = struct.Struct('<QQQ8s') # offsets position, index position, number of patterns, MAGIC
+
+class PatternStoreWriter:
+    """ Writes banding patterns into a single binary file, which can be memory mapped by PatternStore
+
+    Patterns are written as they come, only the offsets and names are kept in memory until close().
+    Use it as a context manager or call close(), as the file is not readable before. If the context
+    is left with an exception, the incomplete file is removed, see abort().
+
+    Arguments:
+        path: path of the store file, overwritten if it exists.
+        dtype: optional, dtype of the stored values.
+    """
+
+    def __init__(self, path, dtype=np.int8):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.names = []
+        self.offsets = [0]
+        self._name_set = set()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC.ljust(DATA_OFFSET, b'\0'))
+
+    def write(self, name, pattern):
+        """ Appends a banding pattern
+
+        Arguments:
+            name: unique name of the pattern, e.g. the file name.
+            pattern: 1D sequence of values.
+        """
+        if name in self._name_set:
+            raise ValueError("Duplicate pattern name '{0}'.".format(name))
+
+        pattern = np.ascontiguousarray(pattern, dtype=self.dtype).ravel()
+        self._file.write(pattern.tobytes())
+        self.names.append(name)
+        self._name_set.add(name)
+        self.offsets.append(self.offsets[-1] + len(pattern))
+
+    def close(self):
+        """ Writes the offsets and the name index, after which the store is complete
+        """
+        if self._file.closed:
+            return
+
+        f = self._file
+        # Align the offsets for the memory map
+        f.write(b'\0' * (-f.tell() % 8))
+        offsets_pos = f.tell()
+        f.write(np.asarray(self.offsets, dtype='<i8').tobytes())
+
+        index_pos = f.tell()
+        index = {'dtype': self.dtype.str, 'names': self.names}
+        f.write(json.dumps(index).encode('utf-8'))
+        f.write(FOOTER.pack(offsets_pos, index_pos, len(self.names), MAGIC))
+        f.close()
+
+    def abort(self):
+        """ Closes and removes the incomplete file, e.g. after a failed conversion
+        """
+        if not self._file.closed:
+            self._file.close()
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            self.abort()
+        else:
+            self.close()
+
+class PatternStore:
+    """ Memory mapped reader of a banding pattern store, see PatternStoreWriter
+
+    Patterns are returned as read-only, zero-copy views into the file. Index the store with an integer
+    or with the name of a pattern.
+
+    Arguments:
+        path: path of the store file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("'{0}' is not a banding pattern store.".format(path))
+
+            f.seek(-FOOTER.size, os.SEEK_END)
+            end = f.tell()
+            offsets_pos, index_pos, count, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError("'{0}' is incomplete, the writer was not closed.".format(path))
+
+            f.seek(index_pos)
+            index = json.loads(f.read(end - index_pos).decode('utf-8'))
+
+        self.dtype = np.dtype(index['dtype'])
+        self.names = index['names']
+        self._indices = {name: i for i, name in enumerate(self.names)}
+
+        self.offsets = np.memmap(path, dtype='<i8', mode='r', offset=offsets_pos, shape=(count + 1,))
+        values_count = int(self.offsets[-1])
+        if values_count > 0:
+            self.values = np.memmap(path, dtype=self.dtype, mode='r', offset=DATA_OFFSET, shape=(values_count,))
+        else:
+            self.values = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._indices
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._indices[key]
+        elif key < 0:
+            key += len(self)
+
+        if not 0 <= key < len(self):
+            raise IndexError("Pattern index {0} out of range.".format(key))
+
+        return self.values[self.offsets[key]:self.offsets[key + 1]]
+
+    def index(self, name):
+        """ Returns the index of a pattern name
+        """
+        return self._indices[name]
+
+    def lengths(self):
+        """ Returns the lengths of all patterns as numpy array
+        """
+        return np.diff(self.offsets)
+
+    def items(self):
+        """ Iterates over tuples of name and pattern
+        """
+        for i, name in enumerate(self.names):
+            yield name, self[i]
+
+def write_pattern_store(path, patterns, dtype=np.int8):
+    """ Saves banding patterns as binary store
+
+    Arguments:
+        path: path of the store file.
+        patterns: dictionary of name and pattern, or an iterable of tuples of name and pattern.
+        dtype: optional, dtype of the stored values.
+    """
+    if isinstance(patterns, dict):
+        patterns = patterns.items()
+
+    with PatternStoreWriter(path, dtype) as writer:
+        for name, pattern in patterns:
+            writer.write(name, pattern)
+
+def parse_pattern(text, dtype=np.int8):
+    """ Parses a space separated banding pattern of a csv row
+
+    Resized patterns can be written as floats (e.g. "1.0"), so the values are parsed as floats first.
+
+    Arguments:
+        text: the pattern string.
+        dtype: optional, dtype of the pattern.
+    """
+    return np.asarray(text.split(), dtype=float).astype(dtype)
+
+def read_patterns_csv(csv_path, dtype=np.int8):
+    """ Reads a banding pattern csv, as written by folder_to_bp_csv()
+
+    Arguments:
+        csv_path: path of the csv file.
+        dtype: optional, dtype of the patterns.
+
+    Returns:
+        Generator of tuples of file name and pattern
+    """
+    with open(csv_path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader, None) # header
+        for row in reader:
+            if len(row) != 2:
+                continue
+            yield row[0], parse_pattern(row[1], dtype)
+
+def csv_to_pattern_store(csv_path, store_path, dtype=np.int8):
+    """ Converts a banding pattern csv into a binary store
+
+    Arguments:
+        csv_path: path of the csv file.
+        store_path: path of the store file.
+        dtype: optional, dtype of the stored values.
+
+    Returns:
+        Number of converted patterns
+    """
+    with PatternStoreWriter(store_path, dtype) as writer:
+        for name, pattern in read_patterns_csv(csv_path, dtype):
+            writer.write(name, pattern)
+
+        return len(writer.names)
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Ken Perlin's reference permutation, the same table as the noise package
+PERMUTATION = np.array([
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+    140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+    247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+    57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+    60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+    65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+    200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+    52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+    207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+    119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+    129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+    218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+    81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+    184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+    222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180,
+], dtype=np.int64)
+
+def _gradient(hashes, x):
+    """ Gradients of the noise package, 1 to 8 for positive hashes, otherwise -1
+    """
+    gradients = np.where(hashes & 8, np.float32(-1), (hashes & 7).astype(np.float32) + np.float32(1))
+    return gradients * x
+
+def _noise(x, repeat, bases):
+    """ Single octave of 1D gradient noise, see perlin_noise_1d()
+    """
+    floor = np.floor(x)
+    i = floor.astype(np.int64) % repeat
+    ii = (i + 1) % repeat
+
+    # The noise package indexes its doubled table with (i & 255) + base and reads outside of it for
+    # negative bases, the index wraps around instead
+    i = PERMUTATION[((i & 255) + bases) & 255]
+    ii = PERMUTATION[((ii & 255) + bases) & 255]
+
+    t = x - floor
+    fade = t * t * t * (t * (t * np.float32(6) - np.float32(15)) + np.float32(10))
+    a = _gradient(i, t)
+    b = _gradient(ii, t - np.float32(1))
+
+    return (a + fade * (b - a)) * np.float32(0.4)
+
+def perlin_noise_1d(x, bases=0, octaves=1, lacunarity=2.0, persistence=0.5, repeat=1024):
+    """ Evaluates 1D Perlin (gradient) noise on whole arrays at once
+
+    Reproduces noise.pnoise1() of the noise package (in single precision, like the C extension) for
+    non-negative coordinates and bases, e.g. a whole batch of patterns with one base per row.
+
+    Arguments:
+        x: array of non-negative coordinates.
+        bases: optional, integer array broadcastable to x, offset into the permutation table.
+        octaves: optional, number of octaves that are summed.
+        lacunarity: optional, frequency factor between successive octaves.
+        persistence: optional, amplitude factor between successive octaves.
+        repeat: optional, period of the noise.
+
+    Returns:
+        float32 array of the shape of x, roughly between -1 and 1.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    bases = np.asarray(bases, dtype=np.int64)
+
+    frequency = np.float32(1)
+    amplitude = np.float32(1)
+    total = np.zeros(x.shape, dtype=np.float32)
+    max_amplitude = np.float32(0)
+    for _ in range(octaves):
+        total += _noise(x * frequency, int(np.float32(repeat) * frequency), bases) * amplitude
+        max_amplitude += amplitude
+        frequency *= np.float32(lacunarity)
+        amplitude *= np.float32(persistence)
+
+    return total / max_amplitude
@@ -0,0 +1,196 @@
+import os
+import json
+import tempfile
+import hashlib
+import numpy as np
+
+from .banding_pattern_utils import banding_points_to_csr, csr_to_banding_points
+
+class ResultCache:
+    """ Persistent, content addressed cache for banding pattern extraction results
+
+    Results are stored as compressed npz files in a local folder, keyed by a hash of the image bytes and
+    the extraction parameters. If the folder grows beyond max_size bytes, the least recently used results
+    are evicted. The cache folder can be shared by multiple processes, the hit and miss counters are
+    kept per process.
+
+    Arguments:
+        cache_dir: folder in which the results are stored.
+        max_size: optional, maximum size of the cache folder in bytes.
+    """
+    suffix = '.npz'
+
+    # Results that can not be stored as arrays and are therefore not cached
+    skipped_keys = ['paths', 'longest_path']
+
+    def __init__(self, cache_dir, max_size=2**30):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self.__entries())
+
+    def make_key(self, img, params):
+        """ Creates the cache key of an image and its extraction parameters
+
+        Arguments:
+            img: the chromosome image.
+            params: dictionary of extraction parameters.
+
+        Returns:
+            Hex digest string
+        """
+        img = np.ascontiguousarray(img)
+        h = hashlib.sha256()
+        h.update(str(img.shape).encode())
+        h.update(str(img.dtype).encode())
+        h.update(img.tobytes())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+
+        return h.hexdigest()
+
+    def get(self, key):
+        """ Loads cached results
+
+        Arguments:
+            key: the cache key, see make_key().
+
+        Returns:
+            The results dictionary or None if the key is not cached.
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path) as data:
+                results = self.__unpack(data)
+            os.utime(path) # mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception: # a corrupted entry (e.g. zipfile.BadZipFile) is removed and extracted again
+            self.__remove(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return results
+
+    def put(self, key, results):
+        """ Stores results and evicts the least recently used entries if the cache is full
+
+        Arguments:
+            key: the cache key, see make_key().
+            results: results of get_banding_pattern().
+        """
+        path = self.__path(key)
+        # A unique temporary file per writer, threads and processes may store the same key at once
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix=key + '.', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **self.__pack(results))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._size += os.path.getsize(path)
+        if self._size > self.max_size:
+            self.__evict()
+
+    def cached_form(self, results):
+        """ Converts results into the form in which get() returns them, without 'paths' and 'longest_path'
+        and with arrays instead of lists
+
+        Arguments:
+            results: results of get_banding_pattern().
+        """
+        return self.__unpack(self.__pack(results))
+
+    def clear(self):
+        """ Removes all cached results and resets the counters
+        """
+        for path, _, _ in self.__entries():
+            self.__remove(path)
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """ Cache statistics
+
+        Returns:
+            Dictionary with hits, misses, number of entries and size in bytes.
+        """
+        entries = self.__entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+        }
+
+    def __path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def __entries(self):
+        """ Lists all cache files as tuples of path, size and last usage
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError: # removed by another process
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+
+        return entries
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __evict(self):
+        """ Removes least recently used entries until the cache fits into max_size
+        """
+        entries = sorted(self.__entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._size <= self.max_size:
+                break
+            self.__remove(path)
+            self._size -= size
+
+    def __pack(self, results):
+        """ Converts a results dictionary into arrays
+        """
+        packed = {}
+        for key, value in results.items():
+            if key in self.skipped_keys:
+                continue
+            if key == 'banding_points':
+                packed['banding_points_indices'], packed['banding_points_offsets'] = banding_points_to_csr(value)
+            else:
+                packed[key] = np.asarray(value)
+
+        return packed
+
+    def __unpack(self, data):
+        """ Converts stored arrays back into a results dictionary
+        """
+        results = {}
+        for key in data.keys():
+            if key.startswith('banding_points_'):
+                continue
+            value = data[key]
+            results[key] = value.item() if value.ndim == 0 else value
+
+        if 'banding_points_indices' in data.keys():
+            results['banding_points'] = csr_to_banding_points(data['banding_points_indices'], data['banding_points_offsets'])
+
+        return results
@@ -0,0 +1,32 @@
+import numpy as np
+
+class ScratchBuffers:
+    """ Preallocated, growing buffers for intermediate arrays of repeated extractions
+
+    Each named buffer is only reallocated if a larger array is requested than before. The returned
+    arrays are overwritten by the next request of the same name, so one instance must not be used by
+    multiple threads at the same time.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape, dtype):
+        """ Retrieves an uninitialized array backed by the named buffer
+
+        Arguments:
+            name: name of the buffer.
+            shape: shape of the array.
+            dtype: dtype of the array.
+
+        Returns:
+            The array.
+        """
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.nbytes < nbytes:
+            buffer = np.empty(nbytes, dtype=np.uint8)
+            self.buffers[name] = buffer
+
+        return buffer[:nbytes].view(dtype).reshape(shape)
@@ -0,0 +1,72 @@
+import os
+import json
+import zlib
+
+MARKER_SUFFIX = '.done'
+
+def parse_shard(text):
+    """ Parses a shard specification of the form "i/N", e.g. for argparse
+
+    Arguments:
+        text: the specification, i is zero based.
+
+    Returns:
+        Tuple of shard index and number of shards.
+    """
+    try:
+        index, count = [int(x) for x in text.split('/')]
+    except ValueError:
+        raise ValueError("Invalid shard '{0}', expected 'i/N'.".format(text))
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError("Invalid shard '{0}', expected 0 <= i < N.".format(text))
+
+    return index, count
+
+def shard_of(file_name, count):
+    """ Assigns a file to one of count shards, by a hash of its name that is stable across machines and runs
+    """
+    return zlib.crc32(file_name.encode('utf-8')) % count
+
+def in_shard(file_name, shard):
+    """ Whether a file belongs to a shard, every file belongs to shard None
+    """
+    return shard is None or shard_of(file_name, shard[1]) == shard[0]
+
+def sharded_path(path, shard):
+    """ Inserts the shard into a file path, e.g. "all.csv" becomes "all.shard-0-of-4.csv"
+    """
+    if shard is None:
+        return path
+
+    root, ext = os.path.splitext(path)
+    return "{0}.shard-{1}-of-{2}{3}".format(root, shard[0], shard[1], ext)
+
+def write_shard_marker(path, shard, **info):
+    """ Marks the output of a shard as complete
+
+    Arguments:
+        path: path of the output.
+        shard: tuple of shard index and number of shards.
+        info**: additional information, e.g. the number of written rows.
+    """
+    with open(path + MARKER_SUFFIX, 'w') as f:
+        json.dump(dict(info, shard=list(shard)), f)
+
+def read_shard_marker(path):
+    """ Reads the marker of a shard output
+
+    Returns:
+        Dictionary of the marker information, None if the shard is not complete.
+    """
+    if not os.path.exists(path + MARKER_SUFFIX):
+        return None
+
+    with open(path + MARKER_SUFFIX, 'r') as f:
+        return json.load(f)
+
+def remove_shard_marker(path):
+    """ Removes the marker of a shard output, e.g. before its output is (re)written
+    """
+    if os.path.exists(path + MARKER_SUFFIX):
+        os.remove(path + MARKER_SUFFIX)
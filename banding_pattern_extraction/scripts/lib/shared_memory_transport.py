@@ -0,0 +1,91 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Alignment of the arrays inside a shared memory block in bytes
+ALIGNMENT = 64
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def share_arrays(arrays):
+    """ Copies a dictionary of arrays into a single shared memory block
+
+    Arguments:
+        arrays: dictionary of name and numpy array.
+
+    Returns:
+        A tuple:
+            1. The SharedMemory object, close() it once the block is not needed anymore in this
+               process, unlink() it once it is not needed anymore in any process.
+            2. A small, picklable descriptor of the block, see attach_arrays()
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    layout = {}
+    size = 0
+    for name, array in arrays.items():
+        offset = _aligned(size)
+        layout[name] = (offset, array.shape, array.dtype.str)
+        size = offset + array.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for name, array in arrays.items():
+        offset, shape, dtype = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = array
+
+    return shm, {'name': shm.name, 'layout': layout}
+
+def share_stack(stack):
+    """ Copies a stack of images into shared memory
+
+    Arguments:
+        stack: numpy array, where the first dimension corresponds to the sample.
+
+    Returns:
+        A tuple of the SharedMemory object and a list of descriptors, one per image, see attach_arrays()
+    """
+    shm, descriptor = share_arrays({'stack': stack})
+    offset, shape, dtype = descriptor['layout']['stack']
+    stride = int(np.prod(shape[1:])) * np.dtype(dtype).itemsize
+
+    descriptors = []
+    for i in range(shape[0]):
+        descriptors.append({'name': shm.name, 'layout': {'img': (offset + i * stride, shape[1:], dtype)}})
+
+    return shm, descriptors
+
+def attach_arrays(descriptor):
+    """ Attaches to a shared memory block, without copying its arrays
+
+    Arguments:
+        descriptor: descriptor of share_arrays() or share_stack().
+
+    Returns:
+        A tuple of the SharedMemory object and a dictionary of arrays that are views on the block.
+        Delete all views before calling close() on the SharedMemory object.
+    """
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+
+    arrays = {}
+    for name, (offset, shape, dtype) in descriptor['layout'].items():
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+
+    return shm, arrays
+
+def receive_arrays(descriptor):
+    """ Copies the arrays out of a shared memory block and frees the block
+
+    Arguments:
+        descriptor: descriptor of share_arrays().
+
+    Returns:
+        Dictionary of name and numpy array.
+    """
+    shm, views = attach_arrays(descriptor)
+    arrays = {name: np.array(view) for name, view in views.items()}
+    del views
+
+    shm.close()
+    shm.unlink()
+
+    return arrays
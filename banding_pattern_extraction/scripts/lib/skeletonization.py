@@ -0,0 +1,61 @@
+import numpy as np
+import cv2 as cv
+
+# skimage.morphology is imported on first use, as it is slow to import (and imports matplotlib)
+
+def _lee(blobs):
+    """ Lee thinning, the 2D equivalent of the former skeletonize_3d call """
+    from skimage.morphology import skeletonize
+    return skeletonize(blobs, method='lee')
+
+def _zhang(blobs):
+    """ Zhang-Suen thinning """
+    from skimage.morphology import skeletonize
+    return skeletonize(blobs, method='zhang')
+
+def _medial_axis(blobs):
+    """ Medial axis based on the distance transform """
+    from skimage.morphology import medial_axis
+    return medial_axis(blobs)
+
+def _opencv(blobs):
+    """ Zhang-Suen thinning of opencv-contrib """
+    if not hasattr(cv, 'ximgproc'):
+        raise ImportError("The 'opencv' skeletonization requires opencv-contrib-python (cv2.ximgproc).")
+
+    thinned = cv.ximgproc.thinning(blobs.astype(np.uint8) * 255, thinningType=cv.ximgproc.THINNING_ZHANGSUEN)
+    return thinned != 0
+
+SKELETONIZERS = {
+    'lee': _lee,
+    'zhang': _zhang,
+    'medial_axis': _medial_axis,
+    'opencv': _opencv,
+}
+
+def available_skeletonizers():
+    """ Lists the skeletonization methods that can be used with the installed packages
+
+    Returns:
+        List of method names.
+    """
+    methods = list(SKELETONIZERS.keys())
+    if not hasattr(cv, 'ximgproc'):
+        methods.remove('opencv')
+
+    return methods
+
+def skeletonize_blobs(blobs, method='lee'):
+    """ Skeletonizes a binary chromosome segmentation
+
+    Arguments:
+        blobs: the binary segmentation.
+        method: optional, one of 'lee', 'zhang', 'medial_axis' or 'opencv'.
+
+    Returns:
+        The skeleton as binary image.
+    """
+    if method not in SKELETONIZERS:
+        raise ValueError("Unknown skeletonization method '{0}', choose from: {1}".format(method, list(SKELETONIZERS.keys())))
+
+    return SKELETONIZERS[method](blobs)
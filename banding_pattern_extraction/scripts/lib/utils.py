@@ -1,5 +1,6 @@
 import numpy as np
-import noise
+
+from .perlin_noise import perlin_noise_1d
 
 def clip_bp(bp, bp_max_length):
     """ Clips a banding pattern symmetrically.
@@ -64,6 +65,8 @@ def one_hot_encode(bp, num_labels=3):
 def generate_random_banding_patterns(batch_size, max_bp_length, class_statistics, scale=10, octaves=1, lacunarity=3, persistence=0.7):
     """ Generates a random banding pattern based in perlin noise
 
+    The noise of the whole batch is evaluated at once, see perlin_noise_1d().
+
     Arguments:
         batch_size: amoung ot banding patterns to create
         max_bp_length: the maximum length of a banding pattern
@@ -74,11 +77,10 @@ def generate_random_banding_patterns(batch_size, max_bp_length, class_statistics
         - The one hot encoded perlin noise banding patterns as a numpy array
         - List of length of each banding pattern
     """
-
-    bps_input = np.zeros((batch_size, max_bp_length))
-    bps_one_hot = np.zeros((batch_size, max_bp_length, 3))
     lengths = []
-    
+    bases = np.zeros(batch_size, dtype=np.int64)
+
+    # Draw the random numbers per pattern in the same order as always, so seeded batches stay the same
     amount_modes = len(class_statistics)
     for j in range(batch_size):
 
@@ -91,23 +93,20 @@ def generate_random_banding_patterns(batch_size, max_bp_length, class_statistics
         lengths.append(rnd_length)
 
         # Random starting point for perlin noise
-        base = np.random.randint(np.iinfo(np.int8).min, np.iinfo(np.int8).max)
-
-        # Fill vector with perlin values
-        bp = np.zeros(rnd_length)
-        for i in range(rnd_length):
-            bp[i] = noise.pnoise1((i + 1) / scale, octaves=octaves, lacunarity=lacunarity, persistence=persistence, base=base, repeat=np.iinfo(np.int16).max)
-
-        # Perlin noise between -1 and 1
-        bp = bp > 0 
-        # Pad with -1 at the sides, save as input for network
-        bp_input = pad_bp(bp, max_bp_length, -1)
-        bps_input[j,:] = bp_input
-
-        # Create categorical one hot equivalent, where the -1 corresponds to class 2, for loss calculation
-        bp_categorical = bp_input.copy()
-        bp_categorical[np.where(bp_categorical==-1)] = 2
-        one_hot_bp = one_hot_encode(bp_categorical)
-        bps_one_hot[j,:,:] = one_hot_bp
-
-    return bps_input, bps_one_hot, lengths
\ No newline at end of file
+        bases[j] = np.random.randint(np.iinfo(np.int8).min, np.iinfo(np.int8).max)
+
+    # Position of each entry within its symmetrically padded pattern, see pad_bp()
+    left_pads = (max_bp_length - np.array(lengths, dtype=np.int64).reshape(-1, 1)) // 2
+    positions = np.arange(max_bp_length) - left_pads
+    inside = (positions >= 0) & (positions < np.reshape(lengths, (-1, 1)))
+
+    # Perlin noise between -1 and 1
+    bp = perlin_noise_1d((positions + 1) / scale, bases[:, np.newaxis], octaves, lacunarity, persistence, repeat=np.iinfo(np.int16).max) > 0
+
+    # Pad with -1 at the sides, save as input for network
+    bps_input = np.where(inside, bp, -1).astype(float)
+
+    # Create categorical one hot equivalent, where the -1 corresponds to class 2, for loss calculation
+    bps_one_hot = np.eye(3)[np.where(inside, bp, 2)]
+
+    return bps_input, bps_one_hot, lengths
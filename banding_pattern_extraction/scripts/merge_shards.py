@@ -0,0 +1,149 @@
+import os
+import re
+import csv
+
+from .banding_pattern_extraction_from_folder import output_file_name
+from .banding_pattern_statistics import read_length_statistics, write_length_statistics
+from .lib.pattern_store import PatternStoreWriter, parse_pattern
+from .lib.sharding import read_shard_marker
+
+def find_shards(source_path, csv_name='banding_patterns.csv'):
+    """ Finds the shard outputs of folder_to_bp_csv() and checks that they are complete
+
+    Arguments:
+        source_path: folder that contains the shard outputs.
+        csv_name: optional, csv name that was passed to folder_to_bp_csv()
+
+    Returns:
+        List of the csv paths, ordered by shard index.
+    """
+    root, ext = os.path.splitext(csv_name)
+    pattern = re.compile(r'^{0}\.shard-(\d+)-of-(\d+){1}$'.format(re.escape(root), re.escape(ext)))
+
+    shards = {}
+    counts = set()
+    for file_name in os.listdir(source_path):
+        match = pattern.match(file_name)
+        if match:
+            shards[int(match.group(1))] = os.path.join(source_path, file_name)
+            counts.add(int(match.group(2)))
+
+    if not shards:
+        raise ValueError("No shards of '{0}' found in '{1}'.".format(csv_name, source_path))
+    if len(counts) > 1:
+        raise ValueError("Shards of different partitions found: {0}".format(sorted(counts)))
+
+    count = counts.pop()
+    missing = [i for i in range(count) if i not in shards]
+    if missing:
+        raise ValueError("Missing shards {0} of {1}.".format(missing, count))
+
+    incomplete = [i for i in range(count) if read_shard_marker(shards[i]) is None]
+    if incomplete:
+        raise ValueError("Shards {0} of {1} are not complete.".format(incomplete, count))
+
+    return [shards[i] for i in range(count)]
+
+def merge_shards(source_path, destination, csv_name='banding_patterns.csv', output_format='csv'):
+    """ Merges the shard outputs of folder_to_bp_csv() into a single csv or binary pattern store
+
+    All shards have to be complete, contain as many rows as recorded in their completion marker and
+    no file may appear twice. The rows are sorted by file name. The error logs of the shards are
+    merged into "<destination>_errors.csv", without files that were extracted by a resumed run.
+
+    Arguments:
+        source_path: folder that contains the shard outputs.
+        destination: path of the merged csv or store.
+        csv_name: optional, csv name that was passed to folder_to_bp_csv()
+        output_format: optional, 'csv' or 'store', see PatternStore.
+
+    Returns:
+        Tuple of the number of merged patterns and the number of failed files.
+    """
+    if output_format not in ['csv', 'store']:
+        raise ValueError("Unknown output format '{0}', choose 'csv' or 'store'.".format(output_format))
+
+    rows = {}
+    errors = {}
+    for csv_path in find_shards(source_path, csv_name):
+        marker = read_shard_marker(csv_path)
+        with open(csv_path, 'r') as f:
+            reader = csv.reader(f)
+            next(reader, None) # header
+            shard_rows = [row for row in reader if len(row) == 2]
+
+        if len(shard_rows) != marker['extracted']:
+            raise ValueError("'{0}' contains {1} rows, but {2} were extracted.".format(csv_path, len(shard_rows), marker['extracted']))
+
+        for file_name, bp_string in shard_rows:
+            if file_name in rows:
+                raise ValueError("'{0}' appears in more than one shard.".format(file_name))
+            rows[file_name] = bp_string
+
+        error_path = os.path.splitext(csv_path)[0] + '_errors.csv'
+        if os.path.exists(error_path):
+            with open(error_path, 'r') as f:
+                reader = csv.reader(f)
+                next(reader, None) # header
+                for row in reader:
+                    if len(row) != 2: # e.g. a partially written last row of a killed shard
+                        continue
+                    file_name, error_message = row
+                    # The error log has the original file names, the rows are named without the identifier
+                    errors[file_name] = (output_file_name(file_name, marker.get('identifier')), error_message) # the last attempt of a resumed shard
+
+    # Files that failed first, but were extracted by a resumed run
+    errors = {file_name: message for file_name, (name, message) in errors.items() if name not in rows}
+
+    if output_format == 'csv':
+        with open(destination, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(["file_name", "banding_pattern"])
+            for file_name in sorted(rows):
+                writer.writerow([file_name, rows[file_name]])
+    else:
+        with PatternStoreWriter(destination) as writer:
+            for file_name in sorted(rows):
+                writer.write(file_name, parse_pattern(rows[file_name]))
+
+    with open(os.path.splitext(destination)[0] + '_errors.csv', 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(["file_name", "error_message"])
+        writer.writerows(sorted(errors.items()))
+
+    return len(rows), len(errors)
+
+def merge_statistics_shards(source_path, destination_path):
+    """ Merges the shard outputs "types.csv" and "all.csv" of banding_pattern_statistics.py
+
+    The lengths of all shards are concatenated and the statistics are recomputed. All shards have to
+    be complete and contain as many lengths as recorded in their completion marker.
+
+    Arguments:
+        source_path: folder that contains the shard outputs.
+        destination_path: folder of the merged "types.csv" and "all.csv".
+
+    Returns:
+        Tuple of the number of lengths in the merged "types.csv" and "all.csv".
+    """
+    totals = []
+    for name in ['types.csv', 'all.csv']:
+        sections = {}
+        for path in find_shards(source_path, name):
+            shard_sections = read_length_statistics(path)
+            total = sum(len(lens) for lens in shard_sections.values())
+            if total != read_shard_marker(path)['total']:
+                raise ValueError("'{0}' contains {1} lengths, but its marker records {2}.".format(path, total, read_shard_marker(path)['total']))
+
+            for title, lens in shard_sections.items():
+                sections.setdefault(title, []).extend(lens)
+
+        # Types in numerical order, like banding_pattern_statistics.py writes them
+        titles = sorted(sections, key=lambda title: -1 if title is None else int(title.split()[1]))
+        with open(os.path.join(destination_path, name), 'w') as f:
+            for title in titles:
+                write_length_statistics(f, sections[title], title)
+
+        totals.append(sum(len(lens) for lens in sections.values()))
+
+    return tuple(totals)
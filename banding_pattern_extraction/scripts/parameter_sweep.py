@@ -0,0 +1,122 @@
+import csv
+import itertools
+from time import time
+from multiprocessing import Pool
+import cv2 as cv
+
+from .pipeline import BandingPatternPipeline, STAGES
+
+def _ordered_grid(grid):
+    """ Orders the grid parameters by the first stage that depends on them
+
+    Parameters of early stages vary slowest, so consecutive combinations share as many
+    intermediates as possible.
+    """
+    order = []
+    for _, _, stage_params in STAGES:
+        order += [p for p in stage_params if p in grid and p not in order]
+    order += [p for p in grid if p not in order]
+
+    return order
+
+def sweep_image(name, img, grid, fixed_params=None):
+    """ Runs all parameter combinations of a grid on a single image, sharing intermediates
+
+    Arguments:
+        name: identifier of the image, used in the result rows.
+        img: the chromosome image, or a path to it.
+        grid: dictionary of parameter name and list of values.
+        fixed_params: optional, dictionary of parameters that are the same for all combinations.
+
+    Returns:
+        List of dictionaries, one per combination, see parameter_sweep().
+    """
+    if isinstance(img, str):
+        img = cv.imread(img, 0)
+
+    if fixed_params is None:
+        fixed_params = {}
+
+    pipeline = BandingPatternPipeline(img)
+    keys = _ordered_grid(grid)
+
+    rows = []
+    for values in itertools.product(*[grid[k] for k in keys]):
+        combination = dict(zip(keys, values))
+
+        t1 = time()
+        results = pipeline.run(pickle_conform_results=True, **fixed_params, **combination)
+        duration = time() - t1
+
+        row = {'image': name}
+        row.update(combination)
+        row.update({
+            'binarized_banding_pattern': results.get('binarized_banding_pattern'),
+            'error': results['error'],
+            'error_message': results['error_message'],
+            'time': duration,
+            'recomputed_stages': list(pipeline.recomputed_stages),
+        })
+        rows.append(row)
+
+    return rows
+
+def _sweep_task(args):
+    """ Pool helper, unpacks the arguments of sweep_image() """
+    return sweep_image(*args)
+
+def parameter_sweep(imgs, grid, workers=1, **fixed_params):
+    """ Extracts the banding patterns of a dataset for every combination of a parameter grid
+
+    Each image is handled by one task, which computes every shared intermediate only once (e.g. the
+    skeleton and longest path per threshold) and only reruns the stages that differ between combinations.
+    Images are distributed over multiple processes.
+
+    Arguments:
+        imgs: dictionary of name and image (or image path), or a list of images (or paths).
+        grid: dictionary of parameter name and list of values, e.g. {'pixel_sampling': [5, 8], 'density_sigma': [1, 2]}
+        workers: optional, number of processes.
+        fixed_params**: parameters shared by all combinations, see get_banding_pattern()
+
+    Returns:
+        A list of dictionaries (one row per image and combination) with the keys: 'image', the grid
+        parameters, 'binarized_banding_pattern', 'error', 'error_message', 'time' (seconds spent on this
+        combination) and 'recomputed_stages'.
+    """
+    if not isinstance(imgs, dict):
+        imgs = dict(enumerate(imgs))
+
+    tasks = [(name, img, grid, fixed_params) for name, img in imgs.items()]
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            image_rows = pool.map(_sweep_task, tasks, chunksize=1)
+    else:
+        image_rows = [_sweep_task(task) for task in tasks]
+
+    return [row for rows in image_rows for row in rows]
+
+def sweep_to_csv(rows, path):
+    """ Saves the result rows of parameter_sweep() as csv
+
+    Arguments:
+        rows: result rows of parameter_sweep().
+        path: path of the csv file.
+    """
+    if len(rows) == 0:
+        return
+
+    header = list(rows[0].keys())
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            values = []
+            for key in header:
+                value = row[key]
+                if key == 'binarized_banding_pattern':
+                    value = '' if value is None else " ".join(str(int(x)) for x in value)
+                elif key == 'recomputed_stages':
+                    value = " ".join(value)
+                values.append(value)
+            writer.writerow(values)
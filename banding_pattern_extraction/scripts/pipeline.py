@@ -0,0 +1,362 @@
+import traceback
+import numpy as np
+from scipy.ndimage import binary_fill_holes
+
+from .lib.Graph import Graph
+from .lib.skeletonization import skeletonize_blobs
+from .lib.path_preprocessing import interpolate_ends, subsample, downsample_blobs, upscale_indices
+from .lib.banding_pattern_utils import *
+
+class ExtractionTimeout(Exception):
+    """ Raised inside an extraction that exceeded its time budget, see extract_with_time_budget()
+    """
+    pass
+
+# Default extraction parameters, see get_banding_pattern()
+DEFAULT_PARAMETERS = {
+    'pixel_sampling': 8,
+    'pixel_sigma': 2,
+    'density_sigma': 2,
+    'step_vector': 1,
+    'chromsome_threshold': 254,
+    'size': None,
+    'reject_multiple_blobs': False,
+    'roi_margin': None,
+    'skeleton_method': 'lee',
+    'downsample_factor': 1,
+}
+
+# Results that are returned if pickle_conform_results is set
+PICKLE_CONFORM_KEYS = ['binarized_banding_pattern', 'num_blobs', 'error', 'error_message']
+
+def _threshold(state, chromsome_threshold):
+    """ Segments the chromosome by a grayscale threshold """
+    img = state['img']
+    if img is None:
+        raise ValueError("Empty image")
+
+    if chromsome_threshold == None:
+        chromsome_threshold = np.median(img)
+
+    if state['scratch'] is not None:
+        blobs = state['scratch'].get('threshold', img.shape, bool)
+        return {'blobs': np.less(img, chromsome_threshold, out=blobs)}
+
+    return {'blobs': img < chromsome_threshold}
+
+def _roi(state, roi_margin):
+    """ Restricts all further stages to the bounding box of the chromosome """
+    if roi_margin is None:
+        return {'roi_offset': (0, 0)}
+
+    r_min, r_max, c_min, c_max = blob_bounding_box(state['blobs'], roi_margin)
+
+    return {
+        'img': state['img'][r_min:r_max, c_min:c_max],
+        'blobs': state['blobs'][r_min:r_max, c_min:c_max],
+        'roi_offset': (r_min, c_min),
+    }
+
+def _fill(state):
+    """ Fills holes in the segmentation """
+    if state['scratch'] is not None:
+        blobs = state['scratch'].get('fill', state['blobs'].shape, bool)
+        binary_fill_holes(state['blobs'], output=blobs)
+        return {'blobs': blobs}
+
+    return {'blobs': binary_fill_holes(state['blobs'])}
+
+def _skeleton(state, skeleton_method, downsample_factor):
+    """ Skeletonizes the segmentation, potentially at a lower resolution """
+    blobs = state['blobs']
+    if downsample_factor > 1:
+        blobs = downsample_blobs(blobs, downsample_factor)
+        if not np.any(blobs):
+            raise ValueError("Chromosome vanished after downsampling, reduce the downsample_factor.")
+
+    return {'skeleton': skeletonize_blobs(blobs, skeleton_method)}
+
+def _graph(state):
+    """ Creates the graph of the skeleton and the shortest paths between its endpoints """
+    skeleton = state['skeleton']
+    graph = Graph(skeleton)
+
+    # If there is only a single pixel in the skeleton, add another one on top of it.
+    # This will make the algorithm create a vertical medial axis. We asssume
+    # that the chromsomes are aligned along the vertical axiss.
+    if graph.max_cluster_length < 2:
+        node = list(graph.nodes.values())[0]
+        skeleton = skeleton.copy()
+        skeleton[node.r + 1 , node.c] = 255
+        graph = Graph(skeleton)
+
+    # Shortest paths from each endpoint to each other endpoint in the biggest cluster
+    return {
+        'graph': graph,
+        'skeleton': skeleton,
+        'num_blobs': graph.amount_clusters,
+        'paths': graph.endpoint_paths,
+    }
+
+def _path(state, reject_multiple_blobs):
+    """ Merges the endpoint paths to the longest path, i.e. the medial axis """
+    graph = state['graph']
+    num_blobs = state['num_blobs']
+
+    # Some error handling
+    if num_blobs == 0:
+        raise ValueError("No path detected. Either empty image or circular structure.")
+
+    if num_blobs > 1 and reject_multiple_blobs:
+        raise ValueError("Multiple blobs detected, early rejection.")
+
+    if graph.endpoints == 0:
+        raise ValueError("Circular structure detected. Cluster only has one endpoint.")
+
+    # Merge single paths, to remove branches
+    longest_path = graph.get_longest_merged_path(state['paths'])
+
+    # Extract the row and columns from the nodes
+    r_path, c_path = graph.nodes_to_numpy(longest_path)
+
+    return {'longest_path': longest_path, 'r_path': r_path, 'c_path': c_path}
+
+def _subsample(state, pixel_sampling, downsample_factor):
+    """ Subsamples the medial axis and scales it back to full resolution """
+    # Use linspace, so we dont drop the last value
+    r, c = subsample(state['r_path'], state['c_path'], max(pixel_sampling / downsample_factor, 1))
+
+    if downsample_factor > 1:
+        r, c = upscale_indices(r, c, downsample_factor)
+
+    return {'r': r, 'c': c}
+
+def _interpolate(state):
+    """ Extends the medial axis until it leaves the segmentation """
+    r_interpolated, c_interpolated = interpolate_ends(state['r'], state['c'], state['blobs'])
+
+    return {'r_interpolated': r_interpolated, 'c_interpolated': c_interpolated}
+
+def _sample(state, step_vector):
+    """ Samples the density profile along perpendicular lines """
+    r = state['r']
+    r_sampled, c_sampled, banding_points, banding_pattern = sample(
+        state['r_interpolated'], state['c_interpolated'], state['blobs'], state['img'], res=step_vector)
+
+    # Flip banding pattern if input was upside down
+    if r[0] > r[-1]:
+        banding_pattern = np.flip(banding_pattern)
+
+    return {
+        'r_sampled': r_sampled,
+        'c_sampled': c_sampled,
+        'banding_points': banding_points,
+        'banding_pattern': banding_pattern,
+    }
+
+def _filter(state, density_sigma):
+    """ Filters the density profile """
+    banding_pattern_filtered, banding_pattern_smooth = banding_pattern_filter(state['banding_pattern'], density_sigma)
+
+    return {'banding_pattern_filtered': banding_pattern_filtered, 'banding_pattern_smooth': banding_pattern_smooth}
+
+def _binarize(state):
+    """ Binarizes the filtered density profile """
+    return {'binarized_banding_pattern': binarize_banding_pattern(state['banding_pattern_filtered'])}
+
+def _resize(state, size):
+    """ Potentially resizes the binarized banding pattern """
+    if size is None:
+        return {}
+
+    return {'binarized_banding_pattern': resize_banding_pattern(state['binarized_banding_pattern'], size)}
+
+# The extraction stages in order of execution, with the parameters each stage depends on
+STAGES = [
+    ('threshold', _threshold, ['chromsome_threshold']),
+    ('roi', _roi, ['roi_margin']),
+    ('fill', _fill, []),
+    ('skeleton', _skeleton, ['skeleton_method', 'downsample_factor']),
+    ('graph', _graph, []),
+    ('path', _path, ['reject_multiple_blobs']),
+    ('subsample', _subsample, ['pixel_sampling', 'downsample_factor']),
+    ('interpolate', _interpolate, []),
+    ('sample', _sample, ['step_vector']),
+    ('filter', _filter, ['density_sigma']),
+    ('binarize', _binarize, []),
+    ('resize', _resize, ['size']),
+]
+
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+class BandingPatternPipeline:
+    """ Staged banding pattern extraction of a single chromosome image with memoized intermediates
+
+    Each stage is memoized under the parameters of all stages up to and including itself. Running the
+    pipeline again with changed parameters only recomputes the stages from the first stage that depends
+    on a changed parameter. Intermediates of all parameter combinations are kept until clear() is called.
+
+    Arguments:
+        img: the chromosome image.
+        scratch: optional, ScratchBuffers for the masks of the threshold and fill stages. Only use them
+            if the pipeline runs for a single parameter combination with pickle_conform_results, since
+            the buffers are overwritten by the next extraction.
+    """
+
+    def __init__(self, img, scratch=None):
+        self.img = img
+        self.scratch = scratch
+        self.memo = {}
+        self.recomputed_stages = []
+        self.current_stage = None
+
+    def run(self, pickle_conform_results=False, **params):
+        """ Runs the extraction, reusing memoized intermediates where possible
+
+        Arguments:
+            pickle_conform_results: optional, only return serializable results.
+            params**: extraction parameters, see get_banding_pattern().
+
+        Returns:
+            The results dictionary, see get_banding_pattern(). The names of the stages that were
+            recomputed can be found in self.recomputed_stages. Error results name the failed stage
+            in 'stage'.
+        """
+        unknown = set(params) - set(DEFAULT_PARAMETERS)
+        if unknown:
+            raise TypeError("Unknown extraction parameters: {0}".format(sorted(unknown)))
+
+        params = dict(DEFAULT_PARAMETERS, **params)
+        self.recomputed_stages = []
+
+        try:
+            state = self.run_stages(params)
+            return self.__results(state, params, pickle_conform_results)
+
+        except Exception as e:
+
+            if hasattr(e, 'message'):
+                message = e.message
+            elif str(e):
+                message = str(e)
+            else:
+                message = "No error message"
+
+            if isinstance(e, ExtractionTimeout):
+                message = "{0} in stage '{1}'".format(message, self.current_stage)
+
+            results = {
+                'error': True,
+                'error_message': message,
+                'stack_trace':  traceback.format_exc(),
+                'stage': self.current_stage
+            }
+
+            return results
+
+    def run_stages(self, params, until=None):
+        """ Runs the extraction stages, without error handling and without mapping to the original image
+
+        Arguments:
+            params: complete dictionary of extraction parameters.
+            until: optional, name of the last stage that should be run.
+
+        Returns:
+            Dictionary of all intermediates up to the last stage.
+        """
+        state = {'img': self.img, 'scratch': self.scratch}
+        key = ()
+        for name, stage, stage_params in STAGES:
+            self.current_stage = name
+            stage_args = [params[p] for p in stage_params]
+            key = key + (name,) + tuple(stage_args)
+
+            if key not in self.memo:
+                self.memo[key] = stage(state, *stage_args)
+                self.recomputed_stages.append(name)
+
+            state = dict(state, **self.memo[key])
+
+            if name == until:
+                break
+
+        self.current_stage = None
+
+        return state
+
+    def clear(self):
+        """ Drops all memoized intermediates
+        """
+        self.memo = {}
+
+    def __results(self, state, params, pickle_conform_results):
+        """ Assembles the results dictionary and maps all coordinates to the original image
+        """
+        if pickle_conform_results:
+            return {
+                'binarized_banding_pattern': state['binarized_banding_pattern'],
+                'num_blobs': state['num_blobs'],
+                'error': False,
+                'error_message': ''
+            }
+
+        results = {
+            'binarized_banding_pattern': state['binarized_banding_pattern'],
+            'banding_pattern_filtered': state['banding_pattern_filtered'],
+            'banding_pattern_smooth': state['banding_pattern_smooth'],
+            'banding_points': state['banding_points'],
+            'banding_pattern': state['banding_pattern'],
+            'r': state['r'],
+            'c': state['c'],
+            'r_interpolated': state['r_interpolated'],
+            'c_interpolated': state['c_interpolated'],
+            'r_sampled': state['r_sampled'],
+            'c_sampled': state['c_sampled'],
+            'paths': state['paths'],
+            'longest_path': state['longest_path'],
+            'skeleton': state['skeleton'],
+            'blobs': state['blobs'],
+            'num_blobs': state['num_blobs'],
+            'error': False,
+            'error_message': '',
+            'stack_trace': ''
+        }
+
+        factor = params['downsample_factor']
+        r_offset, c_offset = state['roi_offset']
+        if factor == 1 and params['roi_margin'] is None:
+            return results
+
+        # Map the graph nodes to the full resolution of the original image. The memoized nodes
+        # are copied, so repeated runs do not shift them again.
+        shape = state['blobs'].shape
+        mapped_nodes = {}
+        for node in state['graph'].nodes.values():
+            r_node, c_node = upscale_indices(node.r, node.c, factor)
+            r_node = min(int(np.round(r_node)), shape[0] - 1) + r_offset
+            c_node = min(int(np.round(c_node)), shape[1] - 1) + c_offset
+            mapped_nodes[node.key] = Graph.Node((r_node, c_node))
+
+        results['paths'] = [[mapped_nodes[node.key] for node in path] for path in state['paths']]
+        results['longest_path'] = [mapped_nodes[node.key] for node in state['longest_path']]
+
+        roi = (slice(r_offset, r_offset + shape[0]), slice(c_offset, c_offset + shape[1]))
+        skeleton = np.zeros(self.img.shape, dtype=state['skeleton'].dtype)
+        for node in mapped_nodes.values():
+            skeleton[node.r, node.c] = 1
+        blobs = np.zeros(self.img.shape, dtype=state['blobs'].dtype)
+        blobs[roi] = state['blobs']
+
+        results['skeleton'] = skeleton
+        results['blobs'] = blobs
+
+        # Coordinates of the medial axis and the perpendicular lines are already at full resolution
+        results['r'] = state['r'] + r_offset
+        results['c'] = state['c'] + c_offset
+        results['r_interpolated'] = state['r_interpolated'] + r_offset
+        results['c_interpolated'] = state['c_interpolated'] + c_offset
+        results['r_sampled'] = state['r_sampled'] + r_offset
+        results['c_sampled'] = state['c_sampled'] + c_offset
+        results['banding_points'] = shift_banding_points(state['banding_points'], r_offset, c_offset)
+
+        return results
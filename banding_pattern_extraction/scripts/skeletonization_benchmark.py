@@ -0,0 +1,67 @@
+from time import time
+import numpy as np
+from scipy.ndimage import binary_fill_holes
+
+from .banding_pattern_extraction import get_banding_pattern
+from .lib.skeletonization import skeletonize_blobs, available_skeletonizers
+from .lib.banding_pattern_utils import banding_pattern_agreement
+
+def benchmark_skeletonizers(imgs, methods=None, reference='lee', repeats=3, chromsome_threshold=254, **args):
+    """ Compares run time and banding pattern stability of the skeletonization backends
+
+    Arguments:
+        imgs: dictionary of name and chromosome image.
+        methods: optional, list of skeletonization methods, otherwise all available ones.
+        reference: optional, method whose banding patterns serve as reference.
+        repeats: optional, number of timed repetitions per image.
+        chromsome_threshold: optional, the grayscale segmentation threshold.
+        args**: see banding_pattern_extraction.py
+
+    Returns:
+        List of dictionaries, one per method and image, containing the skeletonization time, the total
+        extraction time, the length of the longest path and the banding pattern agreement with the reference.
+    """
+    if methods is None:
+        methods = available_skeletonizers()
+
+    references = {}
+    for name, img in imgs.items():
+        results = get_banding_pattern(img, chromsome_threshold=chromsome_threshold, skeleton_method=reference, **args)
+        if not results['error']:
+            references[name] = results
+
+    rows = []
+    for method in methods:
+        for name, img in imgs.items():
+            blobs = binary_fill_holes(img < chromsome_threshold)
+
+            t1 = time()
+            for _ in range(repeats):
+                skeletonize_blobs(blobs, method)
+            skeleton_time = (time() - t1) / repeats
+
+            t1 = time()
+            for _ in range(repeats):
+                results = get_banding_pattern(img, chromsome_threshold=chromsome_threshold, skeleton_method=method, **args)
+            extraction_time = (time() - t1) / repeats
+
+            row = {
+                'method': method,
+                'image': name,
+                'skeleton_time': skeleton_time,
+                'extraction_time': extraction_time,
+                'error': results['error'],
+                'path_length': np.nan,
+                'reference_path_length': np.nan,
+                'agreement': np.nan,
+            }
+
+            if not results['error'] and name in references:
+                row['path_length'] = len(results['longest_path'])
+                row['reference_path_length'] = len(references[name]['longest_path'])
+                row['agreement'] = banding_pattern_agreement(
+                    results['binarized_banding_pattern'], references[name]['binarized_banding_pattern'])
+
+            rows.append(row)
+
+    return rows
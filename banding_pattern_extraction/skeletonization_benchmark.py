@@ -0,0 +1,45 @@
+import argparse
+import os
+import cv2 as cv
+import numpy as np
+
+from scripts.skeletonization_benchmark import benchmark_skeletonizers
+
+if __name__ == "__main__":
+
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'segmentations')
+
+    parser = argparse.ArgumentParser(description='Compares speed and banding pattern agreement of the skeletonization backends.')
+    parser.add_argument('-s', '--source_path', help='folder of chromosome images', default=default_path)
+    parser.add_argument('--methods', help='skeletonization methods to compare', nargs='*', default=None)
+    parser.add_argument('--reference', help='reference skeletonization method', default='lee')
+    parser.add_argument('--repeats', help='timed repetitions per image', type=int, default=3)
+    parser.add_argument('--threshold', help='Segmentation threshold', type=int, nargs='?', default=254)
+
+    args = parser.parse_args()
+
+    imgs = {}
+    for file_name in sorted(os.listdir(args.source_path)):
+        img = cv.imread(os.path.join(args.source_path, file_name), 0)
+        if img is not None:
+            imgs[file_name] = img
+
+    rows = benchmark_skeletonizers(imgs, args.methods, args.reference, args.repeats, chromsome_threshold=args.threshold)
+
+    print("{0:<12} {1:<28} {2:>10} {3:>12} {4:>10} {5:>10}".format(
+        'method', 'image', 'skel. [ms]', 'extract [ms]', 'path len.', 'agreement'))
+    for row in rows:
+        print("{0:<12} {1:<28} {2:>10.2f} {3:>12.2f} {4:>10} {5:>10.3f}".format(
+            row['method'], row['image'], row['skeleton_time'] * 1000, row['extraction_time'] * 1000,
+            '{0:.0f}/{1:.0f}'.format(row['path_length'], row['reference_path_length']), row['agreement']))
+
+    print()
+    print("Summary (mean over images)")
+    for method in sorted(set(row['method'] for row in rows)):
+        method_rows = [row for row in rows if row['method'] == method]
+        print("{0:<12} skeleton: {1:7.2f} ms  extraction: {2:7.2f} ms  agreement: {3:.3f}  errors: {4}".format(
+            method,
+            np.mean([row['skeleton_time'] for row in method_rows]) * 1000,
+            np.mean([row['extraction_time'] for row in method_rows]) * 1000,
+            np.nanmean([row['agreement'] for row in method_rows]),
+            sum(row['error'] for row in method_rows)))